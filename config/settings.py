@@ -16,4 +16,72 @@ AWS_REGION = "us-east-1"
 # Audio Configuration
 SAMPLE_RATE = 44100
 CHUNK_SIZE = 1024
-AUDIO_CHANNELS = 1
\ No newline at end of file
+AUDIO_CHANNELS = 1
+
+# Prompt Configuration
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1024"))
+PROMPT_HISTORY_TURNS = 3
+
+# Gemini Scheduler Configuration
+GEMINI_REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "60"))
+GEMINI_BURST = 5
+SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "4"))
+SCHEDULER_MAX_RETRIES = 4
+SCHEDULER_BACKOFF_BASE = 0.5  # Seconds before the first retry
+SCHEDULER_BACKOFF_MAX = 8.0
+SCHEDULER_INTERACTIVE_DEADLINE = 10.0  # Seconds a reply or transcription may wait before it is dropped
+SCHEDULER_ANALYSIS_DEADLINE = 30.0
+SCHEDULER_ANALYSIS_MAX_QUEUE = 64     # Queued analysis calls beyond this are shed
+
+# Session History Configuration
+HISTORY_RESIDENT_TURNS = 20  # Older turns stay in the session journal and are loaded lazily
+
+# Context Analysis Configuration
+CONTEXT_DECAY = 0.7       # Weight kept by a tag each turn it is not mentioned again
+CONTEXT_MIN_WEIGHT = 0.1  # Tags below this weight are forgotten
+CONTEXT_MAX_TAGS = 5
+CONTEXT_SETTLE_TIMEOUT = 0.2  # Seconds the next reply waits for the previous turn's analysis
+
+# Text-to-Speech Configuration
+POLLY_MAX_REQUEST_CHARS = 6000  # SynthesizeSpeech limit on the whole SSML request
+TTS_CHUNK_CHARS = 1500          # Target SSML request size per chunk
+TTS_MAX_PARALLEL = 4            # Chunks synthesized concurrently
+TTS_CACHE_BYTES = int(os.getenv("TTS_CACHE_BYTES", str(2 * 1024 * 1024)))  # Audio kept per pipeline
+TTS_OUTPUT_FORMAT = os.getenv("TTS_OUTPUT_FORMAT", "pcm")  # pcm, ogg_vorbis or mp3
+TTS_SAMPLE_RATE = os.getenv("TTS_SAMPLE_RATE", "16000")    # pcm supports 8000 and 16000
+
+# Audio Preprocessing Configuration
+AUDIO_WORKERS = int(os.getenv("AUDIO_WORKERS", "2"))  # Processes for WAV assembly, resampling and VAD
+TRANSCRIBE_SAMPLE_RATE = 16000  # Audio is downsampled to this before upload
+VAD_RMS_THRESHOLD = 300         # 16-bit RMS below which a frame counts as silence
+VAD_PADDING_MS = 200            # Silence kept around detected speech
+
+# Adaptive Generation Configuration
+REPLY_TOKENS_BASE = 150
+REPLY_TOKENS_MIN = 50
+REPLY_TOKENS_MAX = 200
+GENERATION_LATENCY_SLO = float(os.getenv("GENERATION_LATENCY_SLO", "2.5"))  # p95 seconds per reply
+
+# Service Mode Configuration
+SERVICE_PORT = int(os.getenv("SERVICE_PORT", "8080"))
+WARM_POOL_SIZE = int(os.getenv("WARM_POOL_SIZE", "2"))       # Pre-initialized pipelines kept ready
+SERVICE_PROBE_INTERVAL = float(os.getenv("SERVICE_PROBE_INTERVAL", "30"))  # Seconds between dependency probes
+
+# Memory Profiling Configuration
+MEMORY_PROFILING = os.getenv("MEMORY_PROFILING", "0") == "1"  # Trace allocations per pipeline stage
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", "1"))  # Stack depth kept per allocation
+MEMORY_LEAK_TURNS = 5               # Consecutive turns of growth before a leak is suspected
+MEMORY_LEAK_MIN_BYTES = 256 * 1024  # Ignore growth smaller than this across those turns
+
+# Intent Router Configuration
+INTENT_ROUTING = os.getenv("INTENT_ROUTING", "1") == "1"  # Answer trivial inputs locally instead of via Gemini
+INTENT_MIN_CONFIDENCE = 0.75  # Model confidence needed to skip Gemini when no rule matched
+INTENT_ACK_MIN_CONFIDENCE = 0.9  # Higher bar for a model-only acknowledgement, which gets a canned reply
+INTENT_MAX_WORDS = 6          # Longer inputs always go to Gemini
+SLOW_SPEECH_RATE = "80%"      # SSML prosody rate once the student asks ADAM to slow down
+SLOW_DOWN_REPLY = "Of course! I'll speak more slowly."
+ACKNOWLEDGEMENT_REPLIES = [   # $topic is replaced with the current topic
+    "Great! What else would you like to share about $topic?",
+    "Okay! Is there anything about $topic you'd like to talk about next?",
+    "Got it. What do you think about that?",
+]
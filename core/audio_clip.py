@@ -0,0 +1,64 @@
+from typing import List
+
+# Polly output formats and the sample rates each one supports
+SUPPORTED_SAMPLE_RATES = {
+    "pcm": ("8000", "16000"),
+    "ogg_vorbis": ("8000", "16000", "22050", "24000"),
+    "mp3": ("8000", "16000", "22050", "24000"),
+}
+PCM_SAMPLE_WIDTH = 2  # Polly PCM is signed 16-bit little-endian mono
+
+
+def validate_output_format(output_format: str, sample_rate: str):
+    if output_format not in SUPPORTED_SAMPLE_RATES:
+        raise ValueError(f"Unsupported TTS output format: {output_format}")
+    if sample_rate not in SUPPORTED_SAMPLE_RATES[output_format]:
+        raise ValueError(
+            f"Sample rate {sample_rate} is not supported for {output_format}; "
+            f"use one of {', '.join(SUPPORTED_SAMPLE_RATES[output_format])}"
+        )
+
+
+def _strip_id3(segment: bytes) -> bytes:
+    """Drop a leading ID3v2 tag so joined MP3 chunks are a clean run of frames"""
+    if len(segment) < 10 or segment[:3] != b"ID3":
+        return segment
+    size = 0
+    for byte in segment[6:10]:  # Syncsafe integer, 7 bits per byte
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if segment[5] & 0x10 else 0
+    return segment[10 + size + footer:]
+
+
+class AudioClip:
+    """Synthesized speech kept as one segment per TTS chunk, with its format"""
+
+    __slots__ = ("format", "sample_rate", "segments")
+
+    def __init__(self, output_format: str, sample_rate: int, segments: List[bytes]):
+        self.format = output_format
+        self.sample_rate = sample_rate
+        self.segments = segments
+
+    @property
+    def data(self) -> bytes:
+        """The clip as a single stream, joined the way the format allows"""
+        if self.format == "pcm":
+            # Whole samples only, so a chunk boundary can never shift the byte alignment
+            return b"".join(
+                segment[:len(segment) - len(segment) % PCM_SAMPLE_WIDTH] for segment in self.segments
+            )
+        if self.format == "mp3":
+            return b"".join(self.segments[:1] + [_strip_id3(segment) for segment in self.segments[1:]])
+        # Concatenated Ogg streams form a valid chained stream
+        return b"".join(self.segments)
+
+    @property
+    def duration(self) -> float:
+        """Playback length in seconds, known without decoding only for PCM"""
+        if self.format != "pcm":
+            return 0.0
+        return sum(len(segment) for segment in self.segments) / (PCM_SAMPLE_WIDTH * self.sample_rate)
+
+    def __len__(self) -> int:
+        return sum(len(segment) for segment in self.segments)
@@ -5,7 +5,8 @@ import tempfile
 import os
 import threading
 import queue
-from typing import List, Optional
+from typing import List, Optional, Union
+from core.audio_clip import AudioClip
 
 class AudioRecorder:
     def __init__(self, sample_rate: int, chunk_size: int, channels: int):
@@ -45,15 +46,18 @@ class AudioRecorder:
         self.audio_thread = threading.Thread(target=self.record_audio_stream)
         self.audio_thread.start()
 
-    def stop_recording(self, file_path: str) -> bool:
+    def stop_recording_frames(self) -> List[bytes]:
+        """Stop recording and return the captured 16-bit PCM frames"""
         self.is_recording = False
         if self.audio_thread:
             self.audio_thread.join()
 
         while not self.audio_queue.empty():
             self.frames.append(self.audio_queue.get())
+        return self.frames
 
-        if self.frames:
+    def stop_recording(self, file_path: str) -> bool:
+        if self.stop_recording_frames():
             with wave.open(file_path, 'wb') as wf:
                 wf.setnchannels(self.channels)
                 wf.setsampwidth(pyaudio.PyAudio().get_sample_size(pyaudio.paInt16))
@@ -63,13 +67,70 @@ class AudioRecorder:
         return False
 
 class AudioPlayer:
-    @staticmethod
-    def play_audio(audio_data: bytes) -> None:
-        if audio_data is None:
+    """Plays synthesized speech.
+
+    Raw PCM is written straight to an output stream that stays open between
+    responses, so there is no decode step and no device setup per reply.
+    Compressed formats are decoded by pygame as before.
+    """
+
+    PCM_WRITE_BYTES = 4096
+
+    def __init__(self):
+        self.pyaudio: Optional[pyaudio.PyAudio] = None
+        self.stream = None
+        self.stream_rate: Optional[int] = None
+        self.lock = threading.Lock()
+
+    def play_audio(self, audio: Union[AudioClip, bytes, None]) -> None:
+        if audio is None:
             return
 
+        # Plain bytes are MP3, as returned before output formats were configurable
+        if isinstance(audio, bytes):
+            audio = AudioClip("mp3", 0, [audio])
+
+        try:
+            with self.lock:
+                if audio.format == "pcm":
+                    self._play_pcm(audio)
+                elif audio.format == "ogg_vorbis":
+                    # Each chunk is a complete Ogg stream; play them back to back
+                    for segment in audio.segments:
+                        self._play_compressed(segment, ".ogg")
+                else:
+                    self._play_compressed(audio.data, ".mp3")
+
+        except Exception as e:
+            print(f"Error playing audio: {str(e)}")
+
+    def _play_pcm(self, clip: AudioClip):
+        stream = self._output_stream(clip.sample_rate)
+        data = clip.data
+        for start in range(0, len(data), self.PCM_WRITE_BYTES):
+            stream.write(data[start:start + self.PCM_WRITE_BYTES])
+
+    def _output_stream(self, sample_rate: int):
+        """Return the persistent output stream, reopening it only if the sample rate changes"""
+        if self.stream is not None and self.stream_rate == sample_rate:
+            return self.stream
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+        if self.pyaudio is None:
+            self.pyaudio = pyaudio.PyAudio()
+        self.stream = self.pyaudio.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=sample_rate,
+            output=True
+        )
+        self.stream_rate = sample_rate
+        return self.stream
+
+    def _play_compressed(self, audio_data: bytes, suffix: str):
+        temp_file = AudioPlayer._save_temp_audio(audio_data, suffix)
         try:
-            temp_file = AudioPlayer._save_temp_audio(audio_data)
             pygame.mixer.init()
             pygame.mixer.music.load(temp_file)
             pygame.mixer.music.play()
@@ -79,15 +140,21 @@ class AudioPlayer:
 
             pygame.mixer.music.stop()
             pygame.mixer.quit()
+        finally:
             os.remove(temp_file)
 
-        except Exception as e:
-            print(f"Error playing audio: {str(e)}")
+    def close(self):
+        with self.lock:
+            if self.stream is not None:
+                self.stream.stop_stream()
+                self.stream.close()
+                self.stream = None
+            if self.pyaudio is not None:
+                self.pyaudio.terminate()
+                self.pyaudio = None
 
     @staticmethod
-    def _save_temp_audio(audio_data: bytes) -> str:
-        with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as tmp_file:
+    def _save_temp_audio(audio_data: bytes, suffix: str = ".mp3") -> str:
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp_file:
             tmp_file.write(audio_data)
             return tmp_file.name
-        
-#########################################################################################################
\ No newline at end of file
@@ -0,0 +1,178 @@
+import io
+import math
+import threading
+import wave
+from array import array
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Optional
+from config.settings import AUDIO_WORKERS, TRANSCRIBE_SAMPLE_RATE, VAD_RMS_THRESHOLD, VAD_PADDING_MS
+
+try:
+    import audioop
+except ImportError:
+    audioop = None  # Removed in Python 3.13; the array fallbacks below are used instead
+
+SAMPLE_WIDTH = 2  # Recorder captures paInt16
+VAD_FRAME_MS = 30
+WAV_HEADER_BYTES = 44
+
+
+def _samples(pcm: bytes) -> array:
+    samples = array("h")
+    samples.frombytes(pcm)
+    return samples
+
+
+def _rms(pcm: bytes) -> int:
+    if audioop:
+        return audioop.rms(pcm, SAMPLE_WIDTH)
+    samples = _samples(pcm)
+    return int(math.sqrt(sum(sample * sample for sample in samples) / len(samples))) if samples else 0
+
+
+def _to_mono(pcm: bytes) -> bytes:
+    """Average the left and right channels of interleaved stereo"""
+    if audioop:
+        return audioop.tomono(pcm, SAMPLE_WIDTH, 0.5, 0.5)
+    samples = _samples(pcm)
+    return array("h", ((left + right) // 2 for left, right in zip(samples[0::2], samples[1::2]))).tobytes()
+
+
+def _resample(pcm: bytes, source_rate: int, target_rate: int) -> bytes:
+    """Mono rate conversion; the fallback interpolates linearly between neighbouring samples"""
+    if audioop:
+        return audioop.ratecv(pcm, SAMPLE_WIDTH, 1, source_rate, target_rate, None)[0]
+    samples = _samples(pcm)
+    if len(samples) < 2:
+        return pcm
+    step = source_rate / target_rate
+    last = len(samples) - 1
+    output = array("h")
+    for index in range(int(last / step) + 1):
+        position = index * step
+        base = int(position)
+        following = samples[min(base + 1, last)]
+        output.append(int(samples[base] + (following - samples[base]) * (position - base)))
+    return output.tobytes()
+
+
+def _trim_silence(pcm: bytes, sample_rate: int, threshold: int, padding_ms: int) -> bytes:
+    """Energy-based VAD: drop leading and trailing frames quieter than threshold"""
+    frame_bytes = sample_rate * VAD_FRAME_MS // 1000 * SAMPLE_WIDTH
+    voiced = [
+        start for start in range(0, len(pcm), frame_bytes)
+        if _rms(pcm[start:start + frame_bytes]) >= threshold
+    ]
+    if not voiced:
+        return b""
+    padding = sample_rate * padding_ms // 1000 * SAMPLE_WIDTH
+    return pcm[max(0, voiced[0] - padding):min(len(pcm), voiced[-1] + frame_bytes + padding)]
+
+
+def _preprocess(input_name: str, input_size: int, output_name: str, sample_rate: int, channels: int,
+                target_rate: int, threshold: int, padding_ms: int) -> int:
+    """Runs in a worker process: read PCM from shared memory, write a WAV back, return its length"""
+    source = shared_memory.SharedMemory(name=input_name)
+    target = shared_memory.SharedMemory(name=output_name)
+    try:
+        pcm = bytes(source.buf[:input_size])
+        if channels == 2:
+            pcm = _to_mono(pcm)
+        if sample_rate != target_rate:
+            pcm = _resample(pcm, sample_rate, target_rate)
+        pcm = _trim_silence(pcm, target_rate, threshold, padding_ms)
+        if not pcm:
+            return 0
+
+        wav = io.BytesIO()
+        with wave.open(wav, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(SAMPLE_WIDTH)
+            wf.setframerate(target_rate)
+            wf.writeframes(pcm)
+        data = wav.getvalue()
+        if len(data) > target.size:
+            raise ValueError(f"Preprocessed audio ({len(data)} bytes) exceeds the output block ({target.size} bytes)")
+        target.buf[:len(data)] = data
+        return len(data)
+    finally:
+        # The parent owns both blocks and unlinks them
+        source.close()
+        target.close()
+
+
+class AudioPreprocessor:
+    """Turns recorded frames into a compact WAV for transcription in a process pool.
+
+    Frames are copied once into a shared memory block and the worker writes
+    the WAV into a second block, so no audio is pickled between processes
+    and the work runs outside the conversation interpreter's GIL.
+    """
+
+    def __init__(self, workers: int = AUDIO_WORKERS, target_rate: int = TRANSCRIBE_SAMPLE_RATE,
+                 threshold: int = VAD_RMS_THRESHOLD, padding_ms: int = VAD_PADDING_MS):
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.target_rate = target_rate
+        self.threshold = threshold
+        self.padding_ms = padding_ms
+
+    def submit(self, frames: List[bytes], sample_rate: int, channels: int) -> Future:
+        """Queue recorded frames; the future resolves to WAV bytes, or b'' if no speech was found"""
+        input_size = sum(len(frame) for frame in frames)
+        result: Future = Future()
+        if not input_size:
+            result.set_result(b"")
+            return result
+
+        source = shared_memory.SharedMemory(create=True, size=input_size)
+        position = 0
+        for frame in frames:
+            source.buf[position:position + len(frame)] = frame
+            position += len(frame)
+
+        # Mono samples at the target rate, plus slack for the resampler
+        samples = input_size // (SAMPLE_WIDTH * channels)
+        output_size = WAV_HEADER_BYTES + (samples * self.target_rate // sample_rate + 64) * SAMPLE_WIDTH
+        target = shared_memory.SharedMemory(create=True, size=output_size)
+
+        def collect(job: Future):
+            try:
+                length = job.result()
+                result.set_result(bytes(target.buf[:length]))
+            except Exception as e:
+                result.set_exception(e)
+            finally:
+                for block in (source, target):
+                    block.close()
+                    block.unlink()
+
+        try:
+            job = self.executor.submit(
+                _preprocess, source.name, input_size, target.name, sample_rate, channels,
+                self.target_rate, self.threshold, self.padding_ms
+            )
+        except Exception:
+            # A broken or shut-down pool never runs collect, so release the blocks here
+            for block in (source, target):
+                block.close()
+                block.unlink()
+            raise
+        job.add_done_callback(collect)
+        return result
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+_default_preprocessor: Optional[AudioPreprocessor] = None
+_default_lock = threading.Lock()
+
+
+def get_audio_preprocessor() -> AudioPreprocessor:
+    """Return the process-wide preprocessor, starting its workers on first use"""
+    global _default_preprocessor
+    with _default_lock:
+        if _default_preprocessor is None:
+            _default_preprocessor = AudioPreprocessor()
+        return _default_preprocessor
@@ -0,0 +1,81 @@
+import json
+import math
+from typing import Dict, List, NamedTuple, Tuple
+from config.settings import CONTEXT_DECAY, CONTEXT_MIN_WEIGHT, CONTEXT_MAX_TAGS
+from core.interaction import normalize_tags
+
+
+class ContextAnalysis(NamedTuple):
+    """Normalized topic and emotion tags for one exchange"""
+    topics: Tuple[str, ...] = ()
+    emotions: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_model_text(cls, text: str) -> "ContextAnalysis":
+        """Parse the model's JSON output; malformed or truncated output yields no tags"""
+        try:
+            data = json.loads(text)
+        except ValueError:
+            # Usually cut off at max_output_tokens; its fragments would make bogus tags
+            return cls()
+
+        if not isinstance(data, dict):
+            return cls()
+        topics, emotions = data.get("topics"), data.get("emotions")
+        topics = normalize_tags(str(tag) for tag in topics) if isinstance(topics, list) else ()
+        emotions = normalize_tags(str(tag) for tag in emotions) if isinstance(emotions, list) else ()
+        return cls(topics[:CONTEXT_MAX_TAGS], emotions[:CONTEXT_MAX_TAGS])
+
+
+class ContextTracker:
+    """Running, decayed frequency counts of the topics and emotions in a session.
+
+    Every turn multiplies existing weights by `decay` before adding the new
+    tags, so recent themes dominate and stale ones fall below `min_weight`
+    and are dropped. Ties are broken alphabetically to keep output stable.
+    """
+
+    def __init__(self, decay: float = CONTEXT_DECAY, min_weight: float = CONTEXT_MIN_WEIGHT):
+        self.decay = decay
+        self.min_weight = min_weight
+        self.topics: Dict[str, float] = {}
+        self.emotions: Dict[str, float] = {}
+
+    def memory_turns(self) -> int:
+        """Turns after which a tag that is never repeated has decayed away"""
+        return math.ceil(math.log(self.min_weight) / math.log(self.decay)) + 1
+
+    def update(self, analysis: ContextAnalysis):
+        self._update(self.topics, analysis.topics)
+        self._update(self.emotions, analysis.emotions)
+
+    def _update(self, weights: Dict[str, float], tags: Tuple[str, ...]):
+        for tag in list(weights):
+            weights[tag] *= self.decay
+            if weights[tag] < self.min_weight:
+                del weights[tag]
+        for tag in tags:
+            weights[tag] = weights.get(tag, 0.0) + 1.0
+
+    @staticmethod
+    def _top(weights: Dict[str, float], count: int) -> List[str]:
+        return [tag for tag, _ in sorted(weights.items(), key=lambda item: (-item[1], item[0]))[:count]]
+
+    def top_topics(self, count: int = CONTEXT_MAX_TAGS) -> List[str]:
+        return self._top(self.topics, count)
+
+    def top_emotions(self, count: int = 2) -> List[str]:
+        return self._top(self.emotions, count)
+
+    def summary(self) -> str:
+        """One compact line for the prompt, empty before anything has been analyzed"""
+        parts = []
+        if self.topics:
+            parts.append("Themes so far: " + ", ".join(self.top_topics()) + ".")
+        if self.emotions:
+            parts.append("Student mood: " + ", ".join(self.top_emotions()) + ".")
+        return " ".join(parts)
+
+    def reset(self):
+        self.topics.clear()
+        self.emotions.clear()
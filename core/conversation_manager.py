@@ -1,34 +1,57 @@
 import os
-import json
+import time
 from datetime import datetime
-from typing import List, Dict
+from concurrent.futures import Future, TimeoutError
+from typing import List, Optional, Tuple
 from models.ai_model import AIModerator
+from core.prompt_builder import PromptBuilder
+from core.interaction import Interaction, InteractionHistory
+from core.context_tracker import ContextAnalysis, ContextTracker
+from core.session_journal import (
+    SessionJournal, migrate_legacy_session, read_session, JOURNAL_FILE, LEGACY_HISTORY_FILE
+)
+from core.session_archive import ARCHIVE_DIR_NAME, SessionArchive
+from config.settings import (
+    HISTORY_RESIDENT_TURNS, PROMPT_HISTORY_TURNS, REPLY_TOKENS_BASE, CONTEXT_SETTLE_TIMEOUT
+)
 import uuid
 
 
 class ConversationManager:
-    def __init__(self, ai_moderator: AIModerator):
-        self.history: List[Dict] = []
+    def __init__(self, ai_moderator: AIModerator, sessions_dir: str = "sessions_history"):
+        self.history = InteractionHistory()
+        self.journal: Optional[SessionJournal] = None
         self.ai_moderator = ai_moderator
+        self.prompt_builder = PromptBuilder()
+        self.context_tracker = ContextTracker()
         self.current_topic: str = ""
         self.session_id: str = ""
-        self.sessions_dir: str = "sessions_history"
+        self.sessions_dir: str = sessions_dir
+        # The latest exchange while its context analysis is still running
+        self.pending: Optional[Tuple[float, str, str, Future]] = None
+        # Analyses that missed their turn; their tags still reach the tracker once they finish
+        self.late: List[Future] = []
 
         # Ensure the main sessions folder exists
         os.makedirs(self.sessions_dir, exist_ok=True)
+        self.archive = SessionArchive(os.path.join(self.sessions_dir, ARCHIVE_DIR_NAME))
 
     def start_new_conversation(self, topic: str):
         """Initialize a new conversation with a given topic and create session directory"""
+        self.settle_analysis(timeout=None)
         self.current_topic = topic
-        self.history = []
         self.session_id = datetime.now().strftime("%Y%m%d_%H%M%S") + f"_{uuid.uuid4().hex[:8]}"
         
         # Create directory for the session
         session_folder = os.path.join(self.sessions_dir, self.session_id)
         os.makedirs(session_folder, exist_ok=True)
         
-        # Save initial state
-        self._save_session_history()
+        # Start the session journal; older turns are read back from it on demand
+        self.journal = SessionJournal.for_session(session_folder)
+        self.journal.write_header(self.session_id, topic)
+        self.history = InteractionHistory(self.journal, HISTORY_RESIDENT_TURNS)
+        self.context_tracker.reset()
+        self.late = []
         
         # Generate initial conversation starter
         context = self._generate_initial_prompt(topic)
@@ -37,94 +60,112 @@ class ConversationManager:
         self.add_interaction("", response)  # Empty user input for initial greeting
         return response
 
-    def add_interaction(self, user_input: str, ai_response: str):
-        """Add interaction to the history and save to file"""
-        interaction = {
-            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            'user_input': user_input,
-            'ai_response': ai_response,
-            'context': self.ai_moderator.analyze_conversation_context(self.history)
-        }
-        
-        self.history.append(interaction)
-        
-        # Keep last 5 interactions in memory
-       # if len(self.history) > 5:
-          #  self.history = self.history[-5:]
-        
-        # Save the updated history to the session file
-        self._save_session_history()
+    def resume_session(self, session_id: str) -> str:
+        """Reopen a saved session and keep appending to it, returning ADAM's last reply.
 
-    def _save_session_history(self):
-        """Save the full conversation history to a file in the session folder"""
-        session_folder = os.path.join(self.sessions_dir, self.session_id)
-        history_file = os.path.join(session_folder, "history.json")
-        
-        # Save to file
-        with open(history_file, "w", encoding="utf-8") as file:
-            json.dump({
-                "session_id": self.session_id,
-                "current_topic": self.current_topic,
-                "history": self.history
-            }, file, indent=4)
+        Only the tail needed for the prompt and the running context summary is
+        parsed; older turns are streamed from the journal on demand.
+        """
+        self.settle_analysis(timeout=None)
+        if session_id in ("", ".", "..", ARCHIVE_DIR_NAME) or os.path.basename(session_id) != session_id:
+            raise KeyError(f"Unknown session: {session_id}")
+        session_folder = os.path.join(self.sessions_dir, session_id)
+        if os.path.exists(os.path.join(session_folder, JOURNAL_FILE)):
+            journal = SessionJournal.for_session(session_folder)
+        elif os.path.exists(os.path.join(session_folder, LEGACY_HISTORY_FILE)):
+            journal = migrate_legacy_session(session_folder)
+        elif session_id in self.archive:
+            journal = self.archive.restore(session_id, session_folder)
+        else:
+            raise KeyError(f"Unknown session: {session_id}")
+
+        header = journal.read_header()
+        total_turns = journal.count_turns()
+        tail = journal.read_tail(max(PROMPT_HISTORY_TURNS, self.context_tracker.memory_turns()))
+
+        self.current_topic = header["current_topic"]
+        self.session_id = header["session_id"]
+        self.journal = journal
+        self.history = InteractionHistory(journal, HISTORY_RESIDENT_TURNS, spilled=total_turns - len(tail))
+        self.history.extend_resident(tail)
+
+        self.context_tracker.reset()
+        self.late = []
+        for turn in tail:
+            self.context_tracker.update(ContextAnalysis(turn.topics, turn.emotions))
+
+        return tail[-1].ai_response if tail else ""
+
+    def add_interaction(self, user_input: str, ai_response: str, analyze: bool = True):
+        """Add interaction to the history and append it to the session journal.
+
+        Context analysis runs in the background while the reply is spoken; the
+        exchange is recorded once the next prompt needs it, with its tags if
+        the analysis has finished by then.
+        """
+        self.settle_analysis()
+        if analyze:
+            future = self.ai_moderator.submit_context_analysis(user_input, ai_response)
+            self.pending = (time.time(), user_input, ai_response, future)
+        else:
+            # Locally answered turns carry no new themes
+            self.history.append(Interaction(time.time(), user_input, ai_response))
+
+    def settle_analysis(self, timeout: Optional[float] = CONTEXT_SETTLE_TIMEOUT):
+        """Record the latest exchange, waiting at most `timeout` seconds (None: until done) for its tags.
+
+        Analysis runs in the scheduler's lowest-priority lane, so under load the
+        reply path must not wait for it: a late exchange is journaled without
+        tags, and its tags are added to the running summary when they arrive.
+        """
+        for future in [future for future in self.late if future.done()]:
+            self.late.remove(future)
+            self.context_tracker.update(future.result())
+        if self.pending is None:
+            return
+        timestamp, user_input, ai_response, future = self.pending
+        self.pending = None
+        try:
+            analysis = future.result(timeout=timeout)
+        except TimeoutError:
+            self.late.append(future)
+            self.history.append(Interaction(timestamp, user_input, ai_response))
+            return
+        self.context_tracker.update(analysis)
+        self.history.append(Interaction(timestamp, user_input, ai_response, analysis.topics, analysis.emotions))
+
+    def load_session(self, session_id: str):
+        """Return (header, interactions iterator) for a saved session, in its folder or archived"""
+        session_folder = os.path.join(self.sessions_dir, session_id)
+        # A packed session's folder may remain for its other files, such as the memory report
+        if any(os.path.exists(os.path.join(session_folder, name)) for name in (JOURNAL_FILE, LEGACY_HISTORY_FILE)):
+            return read_session(session_folder)
+        if session_id in self.archive:
+            return self.archive.read(session_id)
+        raise KeyError(f"Unknown session: {session_id}")
 
     def get_conversation_context(self) -> str:
         """Generate context for the AI based on conversation history"""
-        context = f"Current topic: {self.current_topic}\n\n"
-        
-        if self.history:
-            context += "Recent conversation:\n"
-            for exchange in self.history[-3:]:  # Last 3 exchanges for context
-                if exchange['user_input']:  # Skip empty initial input
-                    context += f"User: {exchange['user_input']}\n"
-                context += f"ADAM: {exchange['ai_response']}\n"
-        
-        return context
+        self.settle_analysis()
+        return self.prompt_builder.render_context(self.current_topic, self.history, self.context_tracker.summary())
 
     def _generate_initial_prompt(self, topic: str) -> str:
-        return f"""
-        You are ADAM, a friendly and engaging English Teacher,in Monglish International Academy, with a warm and cool personality.
-        The Student wants to talk about: {topic}
-
-        As ADAM, you should:
-        1. Be genuinely interested and empathetic
-        2. Use a natural, casual speaking style
-        3. Share relevant thoughts and experiences
-        4. Ask thoughtful questions to engage the user
-        5. Keep responses concise but meaningful
-        6. Show personality and appropriate emotion
-        7. Make relevant observations and connections
-
-        Start the conversation by greeting the student warmly and asking an engaging question about {topic}.
-        Make sure your response feels natural and friendly, as if coming from a curious friend.
-        """
+        return self.prompt_builder.build_initial_prompt(topic)
 
-    def get_response_prompt(self, user_input: str) -> str:
+    def get_response_prompt(self, user_input: str, token_limit: int = REPLY_TOKENS_BASE) -> str:
         """Generate a prompt for the AI based on the conversation context and user input"""
-        context = self.get_conversation_context()
-        return f"""
-        You are ADAM, a friendly and empathetic AI companion.
-        
-        Conversation context:
-        {context}
-
-        Student's message: "{user_input}"
-
-        Respond as ADAM would:
-        1. Show you understood their message
-        2. Be genuine and personal in your response
-        3. Share relevant thoughts or perspectives
-        4. Keep the conversation flowing naturally
-        5. Ask questions when appropriate
-        6. Use a warm, friendly tone
-        7. Be concise but engaging
-        8. Ensure your response is short and focused, keeping it within 150 tokens or less
-
-        Remember to maintain the casual, friendly vibe of a natural conversation.
-        """
+        self.settle_analysis()
+        return self.prompt_builder.build_response_prompt(
+            self.current_topic, self.history, user_input, token_limit=token_limit,
+            themes=self.context_tracker.summary()
+        )
 
     def clear_history(self):
         """Clear in-memory history and reset the session"""
-        self.history = []
+        self.settle_analysis(timeout=None)
+        self.late = []
+        self.history = InteractionHistory()
+        self.journal = None
+        self.context_tracker.reset()
         self.current_topic = ""
         self.session_id = ""
\ No newline at end of file
@@ -0,0 +1,205 @@
+import math
+import re
+import threading
+import zlib
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional
+from config.settings import INTENT_MIN_CONFIDENCE, INTENT_ACK_MIN_CONFIDENCE, INTENT_MAX_WORDS
+
+CONVERSE = "converse"        # A real conversational turn for Gemini
+REPEAT = "repeat"            # Say the last reply again
+SLOW_DOWN = "slow_down"      # Say the last reply again, more slowly
+ACKNOWLEDGE = "acknowledge"  # "ok", "thanks", "got it"
+INTENTS = (CONVERSE, REPEAT, SLOW_DOWN, ACKNOWLEDGE)
+
+_NOISE = re.compile(r"[^\w\s']+")
+_SPACES = re.compile(r"\s+")
+_SENTENCE = re.compile(r"[^.!?]*[.!?]+|[^.!?]+$")
+_WORD = re.compile(r"\w")
+QUESTION_TAIL_SENTENCES = 3  # ADAM often follows its question with "I'd love to hear!" or an emoji
+
+# Whole-input rules, checked before the model; slow-down first since it also replays the reply
+_RULES = (
+    (SLOW_DOWN, re.compile(
+        r"(?:(?:please|can you|could you|sorry|adam) )*"
+        r"(?:slow(?: it)? down|(?:speak|talk) (?:more )?slow(?:er|ly)|(?:more )?slowly|slower|"
+        r"(?:you(?:'re| are) )?(?:speaking |talking )?too fast)"
+        r"(?: please| adam)*"
+    )),
+    (REPEAT, re.compile(
+        r"(?:(?:please|can you|could you|sorry|adam) )*"
+        r"(?:repeat(?: that| it| again| please)*|say (?:that|it) again|again|pardon(?: me)?|come again|"
+        r"what did you say|one more time|i didn't (?:hear|catch|get) (?:that|you|it))"
+        r"(?: please| adam)*"
+    )),
+    (ACKNOWLEDGE, re.compile(
+        r"(?:ok(?:ay)?|k|yes|yeah|yep|yup|sure|alright|all right|cool|nice|great|good|got it|i see|"
+        r"i understand|understood|thanks?(?: you)?(?: so much| a lot| very much)?|hm+|uh huh|mhm|right)"
+        r"(?: (?:ok(?:ay)?|thanks?|thank you|so much|adam|teacher))*"
+    )),
+)
+
+# Seed phrases for the hashed-feature model, which catches paraphrases and typos the rules miss
+_TRAINING_EXAMPLES = {
+    REPEAT: [
+        "repeat", "repeat please", "can you repeat that", "could you say that again", "say it again",
+        "please say again", "one more time please", "sorry i didn't hear you", "i did not hear that",
+        "what did you just say", "can you repeat the question", "repaet please", "pls repeat",
+        "again please", "say again", "i missed that", "repeat the question", "sorry what",
+    ],
+    SLOW_DOWN: [
+        "slow down", "slow down please", "please speak slower", "talk more slowly", "too fast",
+        "you are too fast", "you speak too fast", "can you slow down", "slower please", "slowly please",
+        "speak slowly", "sloww down", "it's too fast for me", "i can't follow you are fast",
+    ],
+    ACKNOWLEDGE: [
+        "ok", "okay", "okey", "okk", "thanks", "thank you", "thx", "ty", "got it", "cool", "alright",
+        "i see", "ok thanks", "okay cool", "nice", "great thanks", "understood", "ok i understand",
+        "thank you teacher", "thanks adam", "good", "mhm",
+    ],
+    CONVERSE: [
+        "i like football", "my name is sara", "what is your favorite food", "i went to the park",
+        "can you help me with grammar", "tell me a story", "i don't like it", "my brother plays guitar",
+        "what does that mean", "how are you", "i am fine", "it was fun", "why", "i have a cat",
+        "slow music is relaxing", "say hello to my friend", "i love this song", "i play video games",
+        "my favorite color is blue", "we went to the beach", "i think so too", "what about you",
+        "i'm from cairo", "the movie was too long", "i want to be a doctor", "can you explain",
+        "i read a book yesterday", "my teacher is nice", "i don't know", "i don't think so",
+        "good morning", "what is a verb", "i am tired today", "it is very hot", "no", "nope", "not really",
+        "hello", "hi adam", "repeat after me", "what is that", "let's play a game", "no i don't",
+        "recap our conversations", "recap", "summarize our conversation", "goodbye", "bye", "bye bye",
+        "bye adam", "good bye", "see you", "see you later", "good night", "fine thanks", "i'm good",
+        "not too fast", "it's not too fast", "not fast", "you're not slow", "don't slow down",
+        "no need to repeat", "don't repeat that", "not again", "not ok", "not good", "no thanks",
+    ],
+}
+
+
+def normalize_input(text: str) -> str:
+    """Lowercase, drop punctuation other than apostrophes and collapse whitespace"""
+    return _SPACES.sub(" ", _NOISE.sub(" ", text.lower())).strip()
+
+
+def asks_question(reply: str) -> bool:
+    """Whether one of the closing sentences of a reply is a question, ignoring emoji-only trailers"""
+    sentences = [sentence for sentence in _SENTENCE.findall(reply or "") if _WORD.search(sentence)]
+    return any("?" in sentence for sentence in sentences[-QUESTION_TAIL_SENTENCES:])
+
+
+class IntentRoute(NamedTuple):
+    intent: str
+    confidence: float
+    source: str  # "rule", "model", "answer" or "length"
+
+
+class HashedIntentModel:
+    """Multinomial logistic regression over hashed word, bigram and character trigram features"""
+
+    def __init__(self, dimensions: int = 4096):
+        self.dimensions = dimensions
+        self.weights: Dict[int, List[float]] = {}
+        self.bias = [0.0] * len(INTENTS)
+
+    def features(self, text: str) -> List[int]:
+        words = text.split()
+        tokens = [f"w:{word}" for word in words]
+        tokens += [f"b:{first} {second}" for first, second in zip(words, words[1:])]
+        padded = f" {text} "
+        tokens += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+        # crc32 rather than hash(): string hashing is randomized per process
+        return [zlib.crc32(token.encode("utf-8")) % self.dimensions for token in tokens]
+
+    def _scores(self, features: List[int]) -> List[float]:
+        scores = list(self.bias)
+        for feature in features:
+            row = self.weights.get(feature)
+            if row:
+                for index, weight in enumerate(row):
+                    scores[index] += weight
+        return scores
+
+    def predict(self, text: str) -> Dict[str, float]:
+        scores = self._scores(self.features(text))
+        top = max(scores)
+        exps = [math.exp(score - top) for score in scores]
+        total = sum(exps)
+        return {intent: value / total for intent, value in zip(INTENTS, exps)}
+
+    def train(self, examples: Dict[str, List[str]], epochs: int = 30, learning_rate: float = 0.3):
+        samples = [(self.features(normalize_input(text)), INTENTS.index(intent))
+                   for intent, texts in examples.items() for text in texts]
+        for _ in range(epochs):
+            for features, label in samples:
+                scores = self._scores(features)
+                top = max(scores)
+                exps = [math.exp(score - top) for score in scores]
+                total = sum(exps)
+                for index, value in enumerate(exps):
+                    gradient = learning_rate * ((1.0 if index == label else 0.0) - value / total)
+                    self.bias[index] += gradient
+                    for feature in features:
+                        self.weights.setdefault(feature, [0.0] * len(INTENTS))[index] += gradient
+
+
+class IntentRouter:
+    """Decides whether a student's input needs Gemini or can be answered locally.
+
+    Short inputs are matched against the rule table first, then scored by a
+    small hashed-feature model trained on seed phrases; anything long,
+    unmatched or low-confidence is a conversational turn.
+    """
+
+    def __init__(self, min_confidence: float = INTENT_MIN_CONFIDENCE, max_words: int = INTENT_MAX_WORDS,
+                 ack_min_confidence: float = INTENT_ACK_MIN_CONFIDENCE):
+        self.min_confidence = min_confidence
+        self.ack_min_confidence = ack_min_confidence
+        self.max_words = max_words
+        self.model = HashedIntentModel()
+        self.model.train(_TRAINING_EXAMPLES)
+        self.counts = Counter()
+        self.lock = threading.Lock()
+
+    def classify(self, text: str, expects_answer: bool = False) -> IntentRoute:
+        """Route one input; expects_answer is set when ADAM's last reply asked a question"""
+        normalized = normalize_input(text)
+        words = normalized.split()
+        if not words or len(words) > self.max_words:
+            route = IntentRoute(CONVERSE, 1.0, "length")
+        else:
+            route = next(
+                (IntentRoute(intent, 1.0, "rule") for intent, rule in _RULES if rule.fullmatch(normalized)),
+                None
+            )
+            if route is None:
+                probabilities = self.model.predict(normalized)
+                intent = max(probabilities, key=probabilities.get)
+                confidence = probabilities[intent]
+                # A wrong canned acknowledgement derails the conversation, so it needs more certainty
+                threshold = self.ack_min_confidence if intent == ACKNOWLEDGE else self.min_confidence
+                if confidence < threshold:
+                    intent = CONVERSE
+                route = IntentRoute(intent, confidence, "model")
+            if route.intent == ACKNOWLEDGE and expects_answer:
+                # After a question from ADAM, "right", "good" or "thanks" is a reply to it
+                route = IntentRoute(CONVERSE, route.confidence, "answer")
+
+        with self.lock:
+            self.counts[route.intent] += 1
+        return route
+
+    def get_metrics(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.counts)
+
+
+_default_router: Optional[IntentRouter] = None
+_default_lock = threading.Lock()
+
+
+def get_intent_router() -> IntentRouter:
+    """Return the process-wide router, training its model on first use"""
+    global _default_router
+    with _default_lock:
+        if _default_router is None:
+            _default_router = IntentRouter()
+        return _default_router
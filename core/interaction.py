@@ -0,0 +1,149 @@
+import re
+import sys
+from collections import deque
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+_MARKDOWN = re.compile(r"[*_#`]+|^\s*[-\u2022]\s+")
+_TAG_LABEL = re.compile(r"^\s*(?:key\s+)?(?:topics?|emotional\s+tone|emotions?|tone)\s*:\s*", re.IGNORECASE)
+_BARE_LABEL = re.compile(r"(?:key )?(?:topics?|emotional tone|emotions?|tone)")
+_EMOTION_LABEL = re.compile(r"(?:emotional\s+tone|emotions?|tone)\s*:", re.IGNORECASE)
+_TAG_SPLIT = re.compile(r"[,\n;]+")
+_TAG_NOISE = re.compile(r"[^\w\s'-]+")
+_SPACES = re.compile(r"\s+")
+MAX_TAG_LENGTH = 40
+
+
+def normalize_tag(text: str) -> str:
+    """Lowercase, strip markdown, labels and punctuation, and intern a topic or emotion tag"""
+    # Markdown goes first so labels like "**Emotional Tone:**" are recognized
+    tag = _TAG_LABEL.sub("", _MARKDOWN.sub("", text))
+    tag = _SPACES.sub(" ", _TAG_NOISE.sub(" ", tag)).strip().lower()
+    if not tag or _BARE_LABEL.fullmatch(tag):
+        return ""  # A heading with no tag after it
+    return sys.intern(tag[:MAX_TAG_LENGTH].rstrip())
+
+
+def normalize_tags(values: Iterable[str]) -> Tuple[str, ...]:
+    """Normalize tags, dropping empties and duplicates while keeping first-seen order"""
+    seen = {}
+    for value in values:
+        tag = normalize_tag(value)
+        if tag:
+            seen.setdefault(tag, None)
+    return tuple(seen)
+
+
+def parse_context_tags(context: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """Split a free-text analysis blob into (topics, emotions) tags"""
+    topics, emotions = [], []
+    for segment in _TAG_SPLIT.split(context or ""):
+        (emotions if _EMOTION_LABEL.search(_MARKDOWN.sub("", segment)) else topics).append(segment)
+    return normalize_tags(topics), normalize_tags(emotions)
+
+
+class Interaction:
+    """One student/ADAM exchange with an epoch timestamp and interned tags.
+
+    Turns converted from history.json keep the original timestamp and
+    context text in `legacy`, so migration and archiving lose nothing.
+    """
+
+    __slots__ = ("timestamp", "user_input", "ai_response", "topics", "emotions", "legacy")
+
+    def __init__(self, timestamp: float, user_input: str, ai_response: str,
+                 topics: Tuple[str, ...] = (), emotions: Tuple[str, ...] = (),
+                 legacy: Optional[Dict] = None):
+        self.timestamp = timestamp
+        self.user_input = user_input
+        self.ai_response = ai_response
+        self.topics = topics
+        self.emotions = emotions
+        self.legacy = legacy
+
+    def to_dict(self) -> Dict:
+        data = {
+            "ts": self.timestamp,
+            "user_input": self.user_input,
+            "ai_response": self.ai_response,
+            "topics": list(self.topics),
+            "emotions": list(self.emotions),
+        }
+        if self.legacy:
+            data["legacy"] = self.legacy
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Interaction":
+        return cls(
+            data["ts"],
+            data.get("user_input", ""),
+            data.get("ai_response", ""),
+            normalize_tags(data.get("topics", ())),
+            normalize_tags(data.get("emotions", ())),
+            data.get("legacy"),
+        )
+
+    def __repr__(self):
+        return f"Interaction(timestamp={self.timestamp!r}, user_input={self.user_input!r}, topics={self.topics!r})"
+
+
+class InteractionHistory:
+    """Conversation history that keeps only the most recent turns resident.
+
+    Every turn is written to the session journal as it is appended, so older
+    turns can be dropped from memory and read back lazily on demand.
+    """
+
+    def __init__(self, journal=None, resident_limit: int = 20, spilled: int = 0):
+        self.journal = journal
+        self.resident = deque(maxlen=resident_limit if journal is not None else None)
+        self.spilled = spilled
+
+    def append(self, interaction: Interaction):
+        if self.journal is not None:
+            self.journal.append_interaction(interaction)
+        if self.resident.maxlen is not None and len(self.resident) == self.resident.maxlen:
+            self.spilled += 1
+        self.resident.append(interaction)
+
+    def extend_resident(self, interactions: Iterable[Interaction]):
+        """Load already-journaled turns into memory without writing them again"""
+        for interaction in interactions:
+            if self.resident.maxlen is not None and len(self.resident) == self.resident.maxlen:
+                self.spilled += 1
+            self.resident.append(interaction)
+
+    def older(self) -> Iterator[Interaction]:
+        """Stream the turns no longer resident, oldest first"""
+        if self.spilled and self.journal is not None:
+            for index, interaction in enumerate(self.journal.iter_interactions()):
+                if index >= self.spilled:
+                    break
+                yield interaction
+
+    def tail(self, count: int) -> list:
+        return list(self.resident)[-count:] if count > 0 else []
+
+    def __len__(self) -> int:
+        return self.spilled + len(self.resident)
+
+    def __iter__(self) -> Iterator[Interaction]:
+        yield from self.older()
+        yield from list(self.resident)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if start >= self.spilled and step == 1:
+                return list(self.resident)[start - self.spilled:stop - self.spilled]
+            return [self[i] for i in range(start, stop, step)]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("interaction index out of range")
+        if index >= self.spilled:
+            return self.resident[index - self.spilled]
+        for position, interaction in enumerate(self.older()):
+            if position == index:
+                return interaction
+        raise IndexError("interaction index out of range")
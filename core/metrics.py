@@ -0,0 +1,87 @@
+import bisect
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class LatencyHistogram:
+    """Thread-safe latency histogram with fixed buckets and a window of recent samples for percentiles"""
+
+    def __init__(self, window: int = 1024, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.recent = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self.lock:
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.recent.append(seconds)
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def percentile(self, p: float) -> float:
+        """Percentile (0-100) over the recent window, 0.0 when empty"""
+        with self.lock:
+            samples = sorted(self.recent)
+        if not samples:
+            return 0.0
+        index = min(len(samples) - 1, max(0, math.ceil(p / 100.0 * len(samples)) - 1))
+        return samples[index]
+
+    def summary(self) -> Dict:
+        mean = self.total / self.count if self.count else 0.0
+        with self.lock:
+            buckets = {f"<={bound}s": n for bound, n in zip(self.buckets, self.counts)}
+            buckets[f">{self.buckets[-1]}s"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "mean": mean,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max,
+            "buckets": buckets,
+        }
+
+
+class StageTimer:
+    """Collects a latency histogram per named pipeline stage"""
+
+    def __init__(self, window: int = 1024):
+        self.window = window
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.lock = threading.Lock()
+
+    def histogram(self, name: str) -> LatencyHistogram:
+        with self.lock:
+            if name not in self.histograms:
+                self.histograms[name] = LatencyHistogram(self.window)
+            return self.histograms[name]
+
+    def record(self, name: str, seconds: float):
+        self.histogram(name).record(seconds)
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def summary(self, names: Optional[List[str]] = None) -> Dict[str, Dict]:
+        with self.lock:
+            selected = dict(self.histograms)
+        return {name: hist.summary() for name, hist in selected.items() if names is None or name in names}
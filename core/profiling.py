@@ -0,0 +1,207 @@
+import gc
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from config.settings import TRACEMALLOC_FRAMES, MEMORY_LEAK_TURNS, MEMORY_LEAK_MIN_BYTES
+
+MEMORY_REPORT_FILE = "memory_profile.json"  # Written next to journal.jsonl
+TOP_SOURCES = 10
+
+# Allocations made by the profiler itself are not attributed to stages
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def _retained_sources(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot) -> Counter:
+    """Bytes still held after a stage, grouped by the source line that allocated them"""
+    sources = Counter()
+    for diff in after.filter_traces(_SNAPSHOT_FILTERS).compare_to(before.filter_traces(_SNAPSHOT_FILTERS), "lineno"):
+        if diff.size_diff > 0:
+            frame = diff.traceback[0]
+            sources[f"{frame.filename}:{frame.lineno}"] += diff.size_diff
+    return sources
+
+
+class StageMemory:
+    """Peak and retained allocation totals for one pipeline stage"""
+
+    __slots__ = ("count", "peak_max", "peak_total", "retained_total", "sources")
+
+    def __init__(self):
+        self.count = 0
+        self.peak_max = 0
+        self.peak_total = 0
+        self.retained_total = 0
+        self.sources = Counter()
+
+    def add(self, peak: int, retained: int, sources: Counter):
+        self.count += 1
+        self.peak_max = max(self.peak_max, peak)
+        self.peak_total += peak
+        self.retained_total += retained
+        self.sources.update(sources)
+
+    def summary(self) -> Dict:
+        return {
+            "count": self.count,
+            "peak_max": self.peak_max,
+            "peak_mean": self.peak_total // self.count if self.count else 0,
+            "retained_total": self.retained_total,
+            "top_retained_sources": dict(self.sources.most_common(TOP_SOURCES)),
+        }
+
+
+class SessionMemory:
+    """Per-session stage totals and the traced memory level after each turn"""
+
+    def __init__(self):
+        self.stages: Dict[str, StageMemory] = {}
+        self.turns: List[Dict] = []
+        self.turn_peak = 0
+        self.turn_retained = 0
+        self.leak_suspected = False
+
+    def stage(self, name: str) -> StageMemory:
+        if name not in self.stages:
+            self.stages[name] = StageMemory()
+        return self.stages[name]
+
+    def growth_streak(self) -> int:
+        """Number of consecutive most recent turns that ended with more traced memory than the one before"""
+        streak = 0
+        for previous, current in zip(reversed(self.turns[:-1]), reversed(self.turns)):
+            if current["traced_after"] <= previous["traced_after"]:
+                break
+            streak += 1
+        return streak
+
+
+class MemoryProfiler:
+    """Opt-in tracemalloc profiling of the turn pipeline.
+
+    Each stage is bracketed by snapshots: its peak is measured with
+    `reset_peak`, and bytes still allocated when it ends are attributed to
+    the stage and to the source lines that allocated them. After each turn
+    the traced memory level is recorded after a full collection; a session
+    whose memory keeps rising for MEMORY_LEAK_TURNS turns is flagged. Reports
+    are written to the session folder next to the journal.
+
+    tracemalloc is process-wide, so figures are exact with one session per
+    process; concurrent sessions see each other's allocations in their stages.
+    """
+
+    def __init__(self, frames: int = TRACEMALLOC_FRAMES, leak_turns: int = MEMORY_LEAK_TURNS,
+                 leak_min_bytes: int = MEMORY_LEAK_MIN_BYTES):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self.leak_turns = leak_turns
+        self.leak_min_bytes = leak_min_bytes
+        self.sessions: Dict[str, SessionMemory] = {}
+        self.lock = threading.Lock()
+
+    def session(self, session_id: str) -> SessionMemory:
+        with self.lock:
+            if session_id not in self.sessions:
+                self.sessions[session_id] = SessionMemory()
+            return self.sessions[session_id]
+
+    @contextmanager
+    def stage(self, name: str, session_id: str):
+        before_snapshot = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            sources = _retained_sources(before_snapshot, tracemalloc.take_snapshot())
+            del before_snapshot
+            session = self.session(session_id)
+            with self.lock:
+                session.stage(name).add(peak - before, current - before, sources)
+                session.turn_peak = max(session.turn_peak, peak - before)
+                session.turn_retained += current - before
+
+    def end_turn(self, session_id: str, session_folder: Optional[str] = None):
+        """Record the memory level after a turn, check for leaks and rewrite the session's report"""
+        gc.collect()
+        traced, _ = tracemalloc.get_traced_memory()
+        session = self.session(session_id)
+        with self.lock:
+            session.turns.append({
+                "ts": time.time(),
+                "peak": session.turn_peak,
+                "retained": session.turn_retained,
+                "traced_after": traced,
+            })
+            session.turn_peak = session.turn_retained = 0
+
+            if session.growth_streak() >= self.leak_turns:
+                window = session.turns[-(self.leak_turns + 1):]
+                growth = window[-1]["traced_after"] - window[0]["traced_after"]
+                if growth >= self.leak_min_bytes and not session.leak_suspected:
+                    session.leak_suspected = True
+                    print(f"Warning: memory grew by {growth} bytes over the last {self.leak_turns} turns "
+                          f"of session {session_id}")
+            report = self.report(session_id)
+
+        if session_folder:
+            self.write_report(session_folder, report)
+
+    def report(self, session_id: str) -> Dict:
+        session = self.sessions.get(session_id) or SessionMemory()
+        sources = Counter()
+        for stage in session.stages.values():
+            sources.update(stage.sources)
+        return {
+            "session_id": session_id,
+            "turns": session.turns,
+            "peak_max": max((turn["peak"] for turn in session.turns), default=0),
+            "leak_suspected": session.leak_suspected,
+            "stages": {name: stage.summary() for name, stage in session.stages.items()},
+            "top_retained_sources": dict(sources.most_common(TOP_SOURCES)),
+        }
+
+    def summary(self) -> Dict:
+        """Stage totals across every tracked session, for sizing multi-session hosts"""
+        with self.lock:
+            sessions = dict(self.sessions)
+            stages: Dict[str, StageMemory] = {}
+            for session in sessions.values():
+                for name, stage in session.stages.items():
+                    total = stages.setdefault(name, StageMemory())
+                    total.count += stage.count
+                    total.peak_max = max(total.peak_max, stage.peak_max)
+                    total.peak_total += stage.peak_total
+                    total.retained_total += stage.retained_total
+                    total.sources.update(stage.sources)
+            return {
+                "sessions": len(sessions),
+                "traced_current": tracemalloc.get_traced_memory()[0],
+                "leak_suspected": [session_id for session_id, session in sessions.items() if session.leak_suspected],
+                "stages": {name: stage.summary() for name, stage in stages.items()},
+            }
+
+    @staticmethod
+    def write_report(session_folder: str, report: Dict):
+        path = os.path.join(session_folder, MEMORY_REPORT_FILE)
+        try:
+            with open(path + ".tmp", "w", encoding="utf-8") as file:
+                json.dump(report, file, indent=2)
+            os.replace(path + ".tmp", path)
+        except Exception as e:
+            print(f"Error writing memory report: {str(e)}")
+
+    def discard(self, session_id: str):
+        """Forget a finished session so the profiler itself does not grow without bound"""
+        with self.lock:
+            self.sessions.pop(session_id, None)
@@ -0,0 +1,136 @@
+import re
+from string import Template
+from typing import Dict, List, Sequence, Tuple
+from config.settings import PROMPT_TOKEN_BUDGET, PROMPT_HISTORY_TURNS, REPLY_TOKENS_BASE
+from core.interaction import Interaction
+
+# Fixed persona, sent once per model as the Gemini system instruction
+ADAM_SYSTEM_INSTRUCTION = """You are ADAM, a friendly and engaging English Teacher in Monglish International Academy, with a warm and cool personality.
+
+As ADAM, you should:
+1. Be genuinely interested and empathetic
+2. Use a natural, casual speaking style
+3. Share relevant thoughts and experiences
+4. Ask thoughtful questions to engage the student
+5. Keep responses concise but meaningful
+6. Show personality and appropriate emotion
+7. Make relevant observations and connections
+
+When the student writes to you:
+1. Show you understood their message
+2. Keep the conversation flowing naturally
+3. Use a warm, friendly tone
+
+Remember to maintain the casual, friendly vibe of a natural conversation."""
+
+# Dynamic parts only, compiled once at import time
+_INITIAL_TEMPLATE = Template(
+    "The student wants to talk about: $topic\n"
+    "Start the conversation by greeting the student warmly and asking an engaging question about $topic.\n"
+    "Make sure your response feels natural and friendly, as if coming from a curious friend."
+)
+_TOPIC_TEMPLATE = Template("Current topic: $topic\n")
+_HISTORY_HEADER = "\nRecent conversation:\n"
+_USER_LINE_TEMPLATE = Template("User: $text\n")
+_ADAM_LINE_TEMPLATE = Template("ADAM: $text\n")
+_MESSAGE_TEMPLATE = Template('\nStudent\'s message: "$message"\n')
+_INSTRUCTION_TEMPLATE = Template("Reply as ADAM, short and focused, within $token_limit tokens or less.")
+
+# Rough Gemini token estimate: words and punctuation marks each count as a token
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_TRUNCATION_MARK = " ..."
+
+
+class PromptBuilder:
+    """Assembles the per-turn prompt from precompiled templates within a token budget.
+
+    Truncation is deterministic: the oldest history lines are dropped first,
+    then the student's message is cut from the end. The topic and the reply
+    instruction are never truncated.
+    """
+
+    def __init__(self, token_budget: int = PROMPT_TOKEN_BUDGET, history_turns: int = PROMPT_HISTORY_TURNS):
+        self.token_budget = token_budget
+        self.history_turns = history_turns
+        self.last_section_tokens: Dict[str, int] = {}
+
+    @staticmethod
+    def count_tokens(text: str) -> int:
+        return len(_TOKEN_PATTERN.findall(text))
+
+    def build_initial_prompt(self, topic: str) -> str:
+        prompt = _INITIAL_TEMPLATE.substitute(topic=topic)
+        self.last_section_tokens = {"initial": self.count_tokens(prompt)}
+        return prompt
+
+    def render_history(self, exchanges: Sequence[Interaction]) -> List[str]:
+        """Render the last exchanges as prompt lines, oldest first"""
+        lines = []
+        for exchange in exchanges[-self.history_turns:]:
+            if exchange.user_input:  # Skip empty initial input
+                lines.append(_USER_LINE_TEMPLATE.substitute(text=exchange.user_input.strip()))
+            lines.append(_ADAM_LINE_TEMPLATE.substitute(text=exchange.ai_response.strip()))
+        return lines
+
+    def render_topic(self, topic: str, themes: str = "") -> str:
+        section = _TOPIC_TEMPLATE.substitute(topic=topic)
+        if themes:
+            section += themes + "\n"
+        return section
+
+    def render_context(self, topic: str, exchanges: Sequence[Interaction], themes: str = "") -> str:
+        context = self.render_topic(topic, themes)
+        lines = self.render_history(exchanges)
+        if lines:
+            context += _HISTORY_HEADER + "".join(lines)
+        return context
+
+    def build_response_prompt(self, topic: str, exchanges: Sequence[Interaction], user_input: str,
+                              token_limit: int = REPLY_TOKENS_BASE, themes: str = "") -> str:
+        topic_section = self.render_topic(topic, themes)
+        instruction = _INSTRUCTION_TEMPLATE.substitute(token_limit=token_limit)
+        history_lines = self.render_history(exchanges)
+
+        fixed_tokens = self.count_tokens(topic_section) + self.count_tokens(instruction)
+        message, message_tokens = self._fit_message(user_input.strip(), self.token_budget - fixed_tokens)
+        history_lines, history_tokens = self._fit_history(
+            history_lines, self.token_budget - fixed_tokens - message_tokens
+        )
+
+        self.last_section_tokens = {
+            "topic": self.count_tokens(topic_section),
+            "history": history_tokens,
+            "message": message_tokens,
+            "instruction": self.count_tokens(instruction),
+        }
+
+        prompt = topic_section
+        if history_lines:
+            prompt += _HISTORY_HEADER + "".join(history_lines)
+        return prompt + _MESSAGE_TEMPLATE.substitute(message=message) + instruction
+
+    def _fit_message(self, message: str, budget: int) -> Tuple[str, int]:
+        """Cut the student's message from the end so it fits in the budget"""
+        section_tokens = self.count_tokens(_MESSAGE_TEMPLATE.substitute(message=message))
+        if section_tokens <= budget:
+            return message, section_tokens
+
+        overhead = self.count_tokens(_MESSAGE_TEMPLATE.substitute(message=_TRUNCATION_MARK))
+        keep = max(budget - overhead, 0)
+        matches = list(_TOKEN_PATTERN.finditer(message))
+        cut = matches[keep].start() if keep < len(matches) else len(message)
+        message = message[:cut].rstrip() + _TRUNCATION_MARK
+        return message, self.count_tokens(_MESSAGE_TEMPLATE.substitute(message=message))
+
+    def _fit_history(self, lines: List[str], budget: int) -> Tuple[List[str], int]:
+        """Drop the oldest history lines until the rest fits in the budget"""
+        header_tokens = self.count_tokens(_HISTORY_HEADER)
+        line_tokens = [self.count_tokens(line) for line in lines]
+        total = sum(line_tokens)
+        start = 0
+        while start < len(lines) and total + header_tokens > budget:
+            total -= line_tokens[start]
+            start += 1
+        if start == len(lines):
+            return [], 0
+        return lines[start:], total + header_tokens
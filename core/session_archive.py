@@ -0,0 +1,177 @@
+import gzip
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from core.interaction import Interaction
+from core.session_journal import SessionJournal, read_session, JOURNAL_FILE, LEGACY_HISTORY_FILE
+
+ARCHIVE_DIR_NAME = "archive"  # Inside the sessions directory
+INDEX_FILE = "index.jsonl"
+
+
+class SessionArchive:
+    """Packs closed sessions into daily gzip JSON Lines files.
+
+    Each session is written as its own gzip member (a header line followed by
+    one line per turn), so a whole daily file still decompresses with
+    `zcat` while a single session can be read by seeking to its offset. The
+    append-only `index.jsonl` maps session ids to (file, offset, length);
+    when a session is packed again after being resumed, its last line wins.
+    """
+
+    def __init__(self, archive_dir: str):
+        self.archive_dir = archive_dir
+        self.index_path = os.path.join(archive_dir, INDEX_FILE)
+        self.index: Dict[str, Tuple[str, int, int]] = {}
+        self.index_mtime: Optional[float] = None
+        self.lock = threading.Lock()
+
+    def _load_index(self) -> Dict[str, Tuple[str, int, int]]:
+        """Read the offset index, reloading only when another process has appended to it"""
+        with self.lock:
+            try:
+                mtime = os.path.getmtime(self.index_path)
+            except OSError:
+                return self.index
+            if mtime != self.index_mtime:
+                index = {}
+                with open(self.index_path, encoding="utf-8") as file:
+                    for line in file:
+                        entry = json.loads(line)
+                        index[entry["session_id"]] = (entry["file"], entry["offset"], entry["length"])
+                self.index, self.index_mtime = index, mtime
+            return self.index
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._load_index()
+
+    def session_ids(self) -> List[str]:
+        return list(self._load_index())
+
+    def _read_member(self, session_id: str) -> bytes:
+        file_name, offset, length = self._load_index()[session_id]
+        with open(os.path.join(self.archive_dir, file_name), "rb") as file:
+            file.seek(offset)
+            return gzip.decompress(file.read(length))
+
+    def read(self, session_id: str) -> Tuple[Dict, Iterator[Interaction]]:
+        """Return (header, interactions iterator) for an archived session"""
+        # Split the bytes: str.splitlines() would also break on U+2028 and friends, written raw in the text
+        lines = [line for line in self._read_member(session_id).split(b"\n") if line]
+        header = json.loads(lines[0])
+        return header, (Interaction.from_dict(json.loads(line)) for line in lines[1:])
+
+    def restore(self, session_id: str, session_folder: str) -> SessionJournal:
+        """Recreate a session folder from the archive so the session can be appended to again.
+
+        The archived copy stays indexed; packing the folder again appends a
+        newer copy whose index line supersedes it.
+        """
+        os.makedirs(session_folder, exist_ok=True)
+        journal = SessionJournal.for_session(session_folder)
+        with open(journal.path, "wb") as file:
+            file.write(self._read_member(session_id))
+        return journal
+
+    def pack(self, session_folder: str) -> bool:
+        """Append a session to its daily archive file and remove its turns; False if it was already archived"""
+        header, interactions = read_session(session_folder)
+        session_id = header["session_id"]
+        lines = [json.dumps(header, ensure_ascii=False)]
+        lines.extend(json.dumps(dict(type="turn", **turn.to_dict()), ensure_ascii=False) for turn in interactions)
+        content = ("\n".join(lines) + "\n").encode("utf-8")
+
+        if session_id in self and self._read_member(session_id).count(b"\n") == len(lines):
+            # Packed by an earlier run that stopped before removing the turns
+            self._remove_packed(session_folder)
+            return False
+
+        member = gzip.compress(content)
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+        file_name = "sessions-" + datetime.fromtimestamp(header["created"]).strftime("%Y%m%d") + ".jsonl.gz"
+        with open(os.path.join(self.archive_dir, file_name), "ab") as file:
+            offset = file.tell()
+            file.write(member)
+            file.flush()
+            os.fsync(file.fileno())
+
+        # The index line is only written once the data is on disk
+        entry = {"session_id": session_id, "file": file_name, "offset": offset, "length": len(member)}
+        with self.lock:
+            try:
+                unchanged = os.path.getmtime(self.index_path) == self.index_mtime
+            except OSError:
+                unchanged = self.index_mtime is None
+            with open(self.index_path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(entry) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+            # Keep the cached index current instead of rereading the whole file on the next pack;
+            # if another process appended since the last load, leave it stale so it is reloaded
+            self.index[session_id] = (file_name, offset, len(member))
+            if unchanged:
+                self.index_mtime = os.path.getmtime(self.index_path)
+
+        self._remove_packed(session_folder)
+        return True
+
+    @staticmethod
+    def _remove_packed(session_folder: str):
+        """Delete the session's turn files, and the folder only if nothing else (such as a memory report) is left"""
+        for name in (JOURNAL_FILE, LEGACY_HISTORY_FILE):
+            path = os.path.join(session_folder, name)
+            if os.path.exists(path):
+                os.remove(path)
+        if not os.listdir(session_folder):
+            os.rmdir(session_folder)
+
+    def iter_turn_rows(self) -> Iterator[Dict]:
+        """Flatten every archived turn into a row, for columnar export"""
+        for session_id in self.session_ids():
+            header, interactions = self.read(session_id)
+            for turn_index, turn in enumerate(interactions):
+                yield {
+                    "session_id": session_id,
+                    "current_topic": header.get("current_topic", ""),
+                    "turn": turn_index,
+                    "timestamp": turn.timestamp,
+                    "user_input": turn.user_input,
+                    "ai_response": turn.ai_response,
+                    "topics": list(turn.topics),
+                    "emotions": list(turn.emotions),
+                }
+
+    def export_parquet(self, path: str, batch_rows: int = 50000) -> int:
+        """Write all archived turns to a Parquet file; requires pyarrow"""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export requires pyarrow: pip install pyarrow")
+
+        schema = pa.schema([
+            ("session_id", pa.string()),
+            ("current_topic", pa.string()),
+            ("turn", pa.int32()),
+            ("timestamp", pa.float64()),
+            ("user_input", pa.string()),
+            ("ai_response", pa.string()),
+            ("topics", pa.list_(pa.string())),
+            ("emotions", pa.list_(pa.string())),
+        ])
+        rows_written = 0
+        batch = []
+        with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+            for row in self.iter_turn_rows():
+                batch.append(row)
+                if len(batch) >= batch_rows:
+                    writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                    rows_written += len(batch)
+                    batch = []
+            if batch:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                rows_written += len(batch)
+        return rows_written
@@ -0,0 +1,136 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+from core.interaction import Interaction, parse_context_tags
+
+JOURNAL_FILE = "journal.jsonl"
+LEGACY_HISTORY_FILE = "history.json"
+
+
+class SessionJournal:
+    """Append-only JSON Lines log of a session: a header line, then one line per turn"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+
+    @classmethod
+    def for_session(cls, session_folder: str) -> "SessionJournal":
+        return cls(os.path.join(session_folder, JOURNAL_FILE))
+
+    def write_header(self, session_id: str, current_topic: str, created: Optional[float] = None,
+                     legacy: Optional[Dict] = None):
+        header = {
+            "type": "session",
+            "session_id": session_id,
+            "current_topic": current_topic,
+            "created": created if created is not None else time.time(),
+        }
+        if legacy:
+            header["legacy"] = legacy
+        self._append(header)
+
+    def append_interaction(self, interaction: Interaction):
+        self._append(dict(type="turn", **interaction.to_dict()))
+
+    def read_header(self) -> Dict:
+        with open(self.path, encoding="utf-8") as file:
+            return json.loads(file.readline())
+
+    def iter_interactions(self) -> Iterator[Interaction]:
+        """Stream turns from disk without holding the whole session in memory"""
+        with open(self.path, encoding="utf-8") as file:
+            for line in file:
+                record = json.loads(line)
+                if record.get("type") == "turn":
+                    yield Interaction.from_dict(record)
+
+    def count_turns(self) -> int:
+        """Number of turns in the journal, counted by line without parsing JSON"""
+        lines = 0
+        with open(self.path, "rb") as file:
+            for block in iter(lambda: file.read(1 << 16), b""):
+                lines += block.count(b"\n")
+        return max(lines - 1, 0)  # The first line is the header
+
+    def read_tail(self, count: int, block_size: int = 1 << 14) -> List[Interaction]:
+        """Parse only the last `count` turns by reading the file backwards from the end"""
+        if count <= 0:
+            return []
+        with open(self.path, "rb") as file:
+            file.seek(0, os.SEEK_END)
+            position = file.tell()
+            data = b""
+            # One extra newline so the first kept line is complete
+            while position > 0 and data.count(b"\n") <= count:
+                step = min(block_size, position)
+                position -= step
+                file.seek(position)
+                data = file.read(step) + data
+
+        lines = data.splitlines()
+        if position > 0:
+            lines = lines[1:]  # May be a partial line
+        records = [json.loads(line) for line in lines[-(count + 1):]]
+        return [Interaction.from_dict(record) for record in records if record.get("type") == "turn"][-count:]
+
+    def _append(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.lock, open(self.path, "a", encoding="utf-8") as file:
+            file.write(line)
+
+
+def legacy_interaction(turn: Dict) -> Interaction:
+    """Convert a turn from a pre-journal history.json file, keeping its raw fields"""
+    timestamp = datetime.strptime(turn["timestamp"], "%Y-%m-%d %H:%M:%S").timestamp()
+    topics, emotions = parse_context_tags(turn.get("context", ""))
+    raw = {key: value for key, value in turn.items() if key not in ("user_input", "ai_response")}
+    return Interaction(timestamp, turn.get("user_input", ""), turn.get("ai_response", ""), topics, emotions, raw)
+
+
+def migrate_legacy_session(session_folder: str) -> SessionJournal:
+    """Write a journal for a pre-journal history.json session so it can be appended to.
+
+    The journal is written to a temporary file and moved into place before
+    history.json is removed, so a crash never leaves a partial journal that
+    would be read in preference to the complete history.
+    """
+    header, interactions = read_session(session_folder)
+    journal = SessionJournal.for_session(session_folder)
+    temp = SessionJournal(journal.path + ".tmp")
+    open(temp.path, "w").close()  # Discard what an interrupted migration left behind
+    temp.write_header(header["session_id"], header["current_topic"], header["created"], header.get("legacy"))
+    for interaction in interactions:
+        temp.append_interaction(interaction)
+    with open(temp.path, "rb") as file:
+        os.fsync(file.fileno())
+    os.replace(temp.path, journal.path)
+    os.remove(os.path.join(session_folder, LEGACY_HISTORY_FILE))
+    return journal
+
+
+def read_session(session_folder: str):
+    """Return (header, interactions iterator) for a journal or legacy history.json session"""
+    journal_path = os.path.join(session_folder, JOURNAL_FILE)
+    if os.path.exists(journal_path):
+        journal = SessionJournal(journal_path)
+        return journal.read_header(), journal.iter_interactions()
+
+    with open(os.path.join(session_folder, LEGACY_HISTORY_FILE), encoding="utf-8") as file:
+        session = json.load(file)
+    turns = session.get("history", [])
+    created = legacy_interaction(turns[0]).timestamp if turns else os.path.getmtime(session_folder)
+    header = {
+        "type": "session",
+        "session_id": session["session_id"],
+        "current_topic": session.get("current_topic", ""),
+        "created": created,
+    }
+    # Session fields the journal has no column for, such as the student's name and level
+    legacy = {key: value for key, value in session.items() if key not in ("session_id", "current_topic", "history")}
+    if legacy:
+        header["legacy"] = legacy
+    return header, (legacy_interaction(turn) for turn in turns)
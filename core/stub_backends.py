@@ -0,0 +1,86 @@
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+from core.audio_clip import AudioClip
+from core.context_tracker import ContextAnalysis
+
+# Local stand-ins for Gemini, Polly and the speaker, used for load tests and
+# warmup probes without network access or an audio device.
+
+# Stands in for the scheduler's worker pool for background analysis
+_analysis_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="stub-analysis")
+
+
+class _Latency:
+    """Deterministic jittered sleep around a mean latency"""
+
+    def __init__(self, mean: float, jitter: float, seed: Optional[int]):
+        self.mean = mean
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def sleep(self, scale: float = 1.0):
+        with self.lock:
+            factor = self.random.uniform(1 - self.jitter, 1 + self.jitter)
+        time.sleep(max(0.0, self.mean * scale * factor))
+
+
+class StubAIModerator:
+    """Stands in for AIModerator with canned replies and simulated latency"""
+
+    def __init__(self, reply_latency: float = 0.8, analysis_latency: float = 0.4,
+                 transcription_latency: float = 0.6, jitter: float = 0.3, seed: Optional[int] = None):
+        self.reply_latency = _Latency(reply_latency, jitter, seed)
+        self.analysis_latency = _Latency(analysis_latency, jitter, seed)
+        self.transcription_latency = _Latency(transcription_latency, jitter, seed)
+
+    def warmup(self):
+        self.analysis_latency.sleep()
+
+    def transcribe_audio(self, audio_data: bytes) -> str:
+        self.transcription_latency.sleep()
+        return "This is a stub transcription."
+
+    def generate_response(self, prompt: str, max_output_tokens: Optional[int] = None) -> str:
+        self.reply_latency.sleep()
+        return "That's really interesting! Tell me a bit more about it. What do you enjoy the most?"
+
+    def submit_context_analysis(self, user_input: str, ai_response: str) -> Future:
+        return _analysis_executor.submit(self.analyze_conversation_context, user_input, ai_response)
+
+    def analyze_conversation_context(self, user_input: str, ai_response: str) -> ContextAnalysis:
+        if not user_input:
+            return ContextAnalysis()
+        self.analysis_latency.sleep()
+        return ContextAnalysis(("conversation",), ("friendly",))
+
+
+class StubTextToSpeech:
+    """Stands in for TextToSpeech, returning PCM silence sized to the text"""
+
+    def __init__(self, latency_per_char: float = 0.002, jitter: float = 0.3, seed: Optional[int] = None):
+        self.latency = _Latency(latency_per_char, jitter, seed)
+
+    def warmup(self):
+        self.latency.sleep(scale=10)
+
+    def synthesize(self, text: str, rate: Optional[str] = None) -> Optional[AudioClip]:
+        if not text:
+            return None
+        self.latency.sleep(scale=len(text))
+        # Roughly 60 ms of 16 kHz audio per character, longer at a slower prosody rate
+        stretch = 100.0 / float(rate.rstrip("%")) if rate else 1.0
+        return AudioClip("pcm", 16000, [bytes(int(len(text) * stretch) * 2 * 960)])
+
+
+class NullAudioPlayer:
+    """Discards audio instead of playing it"""
+
+    def play_audio(self, audio) -> None:
+        return None
+
+    def close(self):
+        return None
@@ -1,86 +1,202 @@
 import boto3
 import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, List
-from config.settings import AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_REGION
+from xml.sax.saxutils import escape
+from config.settings import (
+    AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_REGION,
+    POLLY_MAX_REQUEST_CHARS, TTS_CHUNK_CHARS, TTS_MAX_PARALLEL, TTS_CACHE_BYTES,
+    TTS_OUTPUT_FORMAT, TTS_SAMPLE_RATE
+)
+from core.audio_clip import AudioClip, validate_output_format
+
+# Text cleanup, compiled once instead of on every call
+_REPEATED_NAME = re.compile(r'([A-Z]+:)\s*\1')
+_NAME_PREFIX = re.compile(r'^[A-Z]+:\s*')
+_EMOJI = re.compile(r'[\U00010000-\U0010ffff]')
+_WHITESPACE = re.compile(r'\s+')
+_UNSUPPORTED = re.compile(r'[^\w\s.,!?"-\'()]')
+
+# Chunking boundaries, from most to least natural place to split
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+_CLAUSE_BREAK = re.compile(r'(?<=[,;:)])\s+')
+_WORD_BREAK = re.compile(r'\s+')
 
 class TextToSpeech:
-    def __init__(self):
+    def __init__(self, chunk_chars: int = TTS_CHUNK_CHARS, output_format: str = TTS_OUTPUT_FORMAT,
+                 sample_rate: str = TTS_SAMPLE_RATE):
+        validate_output_format(output_format, sample_rate)
+        self.output_format = output_format
+        self.sample_rate = sample_rate
         self.polly = boto3.client(
             "polly",
             region_name=AWS_REGION,
             aws_access_key_id=AWS_ACCESS_KEY_ID,
             aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
         )
+        # Chunks are sized on the final SSML request, never above Polly's limit
+        self.chunk_chars = min(chunk_chars, POLLY_MAX_REQUEST_CHARS)
+        self.executor = ThreadPoolExecutor(max_workers=TTS_MAX_PARALLEL, thread_name_prefix="polly")
+        # LRU of synthesized audio, bounded by total bytes since one PCM reply can be about 1 MB
+        self.cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self.cache_bytes = 0
+        self.cache_limit = TTS_CACHE_BYTES
+        self.cache_lock = threading.Lock()
+
+    def warmup(self):
+        """Open the connection to Polly with a call that synthesizes nothing"""
+        self.polly.describe_voices(Engine="generative", LanguageCode="en-US")
 
-    def synthesize(self, text: str) -> Optional[bytes]:
+    def synthesize(self, text: str, rate: Optional[str] = None) -> Optional[AudioClip]:
+        """Synthesize text, optionally slowed or sped up with an SSML prosody rate such as 80%"""
         try:
             cleaned_text = self._clean_text(text)
-            chunks = self._break_long_text(cleaned_text)
-            audio_chunks = []
-
-            for chunk in chunks:
-                ssml_text = self._generate_ssml(chunk)
-                response = self.polly.synthesize_speech(
-                    Engine="generative",
-                    LanguageCode="en-US",
-                    VoiceId="Matthew",
-                    OutputFormat="mp3",
-                    TextType="ssml",
-                    Text=ssml_text
-                )
-                audio_chunks.append(response["AudioStream"].read())
-
-            return b''.join(audio_chunks) if audio_chunks else None
+            if not cleaned_text:
+                return None
+            # Chunks are measured without the prosody tag, so leave room for it
+            max_length = self.chunk_chars - (self._request_length('', rate) - self._request_length(''))
+            requests = [self._generate_ssml(chunk, rate) for chunk in self._break_long_text(cleaned_text, max_length)]
+
+            # Chunks are balanced in size, so synthesizing them in parallel finishes together
+            if len(requests) == 1:
+                audio_chunks = [self._synthesize_ssml(requests[0])]
+            else:
+                audio_chunks = list(self.executor.map(self._synthesize_ssml, requests))
+
+            return AudioClip(self.output_format, int(self.sample_rate), audio_chunks) if audio_chunks else None
 
         except Exception as e:
             print(f"Error synthesizing speech: {str(e)}")
             return None
 
+    def _synthesize_ssml(self, ssml_text: str) -> bytes:
+        """Synthesize one SSML request, reusing audio for recently spoken requests"""
+        with self.cache_lock:
+            if ssml_text in self.cache:
+                self.cache.move_to_end(ssml_text)
+                return self.cache[ssml_text]
+
+        response = self.polly.synthesize_speech(
+            Engine="generative",
+            LanguageCode="en-US",
+            VoiceId="Matthew",
+            OutputFormat=self.output_format,
+            SampleRate=self.sample_rate,
+            TextType="ssml",
+            Text=ssml_text
+        )
+        audio = response["AudioStream"].read()
+
+        # Only short clips (greetings, templated replies) are worth keeping; long replies rarely repeat
+        if len(audio) <= self.cache_limit // 4:
+            with self.cache_lock:
+                if ssml_text not in self.cache:
+                    self.cache[ssml_text] = audio
+                    self.cache_bytes += len(audio)
+                while self.cache_bytes > self.cache_limit:
+                    _, evicted = self.cache.popitem(last=False)
+                    self.cache_bytes -= len(evicted)
+        return audio
+
     def _clean_text(self, text: str) -> str:
         # Remove repeated name patterns (e.g., "ADAM: ADAM:")
-        cleaned = re.sub(r'([A-Z]+:)\s*\1', r'\1', text)
+        cleaned = _REPEATED_NAME.sub(r'\1', text)
         
         # Remove any single name prefix if present
-        cleaned = re.sub(r'^[A-Z]+:\s*', '', cleaned)
+        cleaned = _NAME_PREFIX.sub('', cleaned)
         
         # Remove emojis and special characters while preserving punctuation
-        cleaned = re.sub(r'[\U00010000-\U0010ffff]', '', cleaned)
+        cleaned = _EMOJI.sub('', cleaned)
         
         # Replace multiple spaces with single space
-        cleaned = re.sub(r'\s+', ' ', cleaned)
+        cleaned = _WHITESPACE.sub(' ', cleaned)
         
         # Remove any remaining problematic characters
-        cleaned = re.sub(r'[^\w\s.,!?"-\'()]', '', cleaned)
+        cleaned = _UNSUPPORTED.sub('', cleaned)
         
         return cleaned.strip()
 
-    def _generate_ssml(self, text: str) -> str:
+    def _generate_ssml(self, text: str, rate: Optional[str] = None) -> str:
+        if rate:
+            text_ssml = f'<prosody rate="{escape(rate)}">{escape(text)}</prosody>'
+        else:
+            text_ssml = escape(text)
         ssml = (
             '<speak>'
-            f'{text}'
+            f'{text_ssml}'
             '</speak>'
         )
         return ssml
 
-    def _break_long_text(self, text: str, max_length: int = 1500) -> List[str]:
-        """Break long text into smaller chunks at sentence boundaries"""
-        if len(text) <= max_length:
+    def _request_length(self, text: str, rate: Optional[str] = None) -> int:
+        """Characters Polly counts against the request limit once the text is wrapped in SSML"""
+        return len(self._generate_ssml(text, rate))
+
+    def _break_long_text(self, text: str, max_length: Optional[int] = None) -> List[str]:
+        """Break text into evenly sized chunks whose SSML requests fit within max_length"""
+        max_length = max_length or self.chunk_chars
+        if self._request_length(text) <= max_length:
             return [text]
-        
-        sentences = re.split('([.!?])', text)
-        chunks = []
-        current_chunk = ''
-        
-        for i in range(0, len(sentences)-1, 2):
-            sentence = sentences[i] + sentences[i+1] if i+1 < len(sentences) else sentences[i]
-            if len(current_chunk) + len(sentence) <= max_length:
-                current_chunk += sentence
+
+        units = self._split_units(text, max_length)
+        overhead = self._request_length('')
+        # Escaped length of each unit plus the space that joins it to the previous one
+        sizes = [len(escape(unit)) + 1 for unit in units]
+        limit = max_length - overhead + 1
+
+        # Keep the fewest chunks, then shrink the largest one as far as that count allows
+        count = len(self._pack(sizes, limit))
+        low, high = max(sizes), limit
+        while low < high:
+            middle = (low + high) // 2
+            if len(self._pack(sizes, middle)) <= count:
+                high = middle
             else:
-                if current_chunk:
-                    chunks.append(current_chunk)
-                current_chunk = sentence
-        
-        if current_chunk:
-            chunks.append(current_chunk)
-            
-        return chunks
\ No newline at end of file
+                low = middle + 1
+
+        return [' '.join(units[start:stop]) for start, stop in self._pack(sizes, low)]
+
+    @staticmethod
+    def _pack(sizes: List[int], capacity: int) -> List[tuple]:
+        """Greedily group consecutive units into (start, stop) ranges of at most capacity"""
+        ranges = []
+        start, used = 0, 0
+        for index, size in enumerate(sizes):
+            if used and used + size > capacity:
+                ranges.append((start, index))
+                start, used = index, 0
+            used += size
+        ranges.append((start, len(sizes)))
+        return ranges
+
+    def _split_units(self, text: str, max_length: int) -> List[str]:
+        """Tokenize into sentences, hard-splitting any too long for one request at clauses, then words"""
+        units = []
+        for sentence in _SENTENCE_BREAK.split(text):
+            units.extend(self._split_oversized(sentence, max_length, (_CLAUSE_BREAK, _WORD_BREAK)))
+        return [unit for unit in units if unit]
+
+    def _split_oversized(self, text: str, max_length: int, breaks) -> List[str]:
+        if self._request_length(text) <= max_length:
+            return [text]
+        if not breaks:
+            # A single unbroken run of characters: cut it to the longest piece that fits
+            size = max(1, max_length - self._request_length(''))
+            while size > 1 and self._request_length(text[:size]) > max_length:
+                size -= 1
+            return [text[:size]] + self._split_oversized(text[size:], max_length, breaks)
+
+        pieces = []
+        current = ''
+        for part in breaks[0].split(text):
+            candidate = f'{current} {part}' if current else part
+            if current and self._request_length(candidate) > max_length:
+                pieces.append(current)
+                current = part
+            else:
+                current = candidate
+        if current:
+            pieces.append(current)
+        return [unit for piece in pieces for unit in self._split_oversized(piece, max_length, breaks[1:])]
@@ -1,30 +1,67 @@
-from config.settings import SAMPLE_RATE, CHUNK_SIZE, AUDIO_CHANNELS
+from config.settings import (
+    SAMPLE_RATE, CHUNK_SIZE, AUDIO_CHANNELS, MEMORY_PROFILING,
+    INTENT_ROUTING, SLOW_SPEECH_RATE, SLOW_DOWN_REPLY, ACKNOWLEDGEMENT_REPLIES
+)
 from core.audio_manager import AudioRecorder, AudioPlayer
 from core.text_to_speech import TextToSpeech
 from core.conversation_manager import ConversationManager
-from models.ai_model import AIModerator
-import pathlib
+from core.audio_worker import get_audio_preprocessor
+from core.metrics import StageTimer
+from core.profiling import MemoryProfiler
+from core.intent_router import get_intent_router, asks_question, REPEAT, SLOW_DOWN, ACKNOWLEDGE
+from core.prompt_builder import PromptBuilder
+from models.ai_model import AIModerator, FALLBACK_RESPONSE
+from models.generation_controller import get_generation_controller
+from contextlib import contextmanager
+from string import Template
+from typing import List
 import os
+import time
 
 
 class ConversationalAI:
-    def __init__(self):
+    def __init__(self, ai_moderator=None, tts=None, audio_player=None,
+                 sessions_dir: str = "sessions_history", stage_timer: StageTimer = None,
+                 memory_profiler: MemoryProfiler = None):
         self.audio_recorder = AudioRecorder(SAMPLE_RATE, CHUNK_SIZE, AUDIO_CHANNELS)
-        self.audio_player = AudioPlayer()
-        self.tts = TextToSpeech()
-        self.ai_moderator = AIModerator()
-        self.conversation_manager = ConversationManager(self.ai_moderator)
-        self.recording_file = "recorded_audio.wav"
+        self.audio_player = audio_player or AudioPlayer()
+        self.tts = tts or TextToSpeech()
+        self.ai_moderator = ai_moderator or AIModerator()
+        self.conversation_manager = ConversationManager(self.ai_moderator, sessions_dir)
+        self.stage_timer = stage_timer or StageTimer()
+        self.audio_preprocessor = get_audio_preprocessor()
+        self.generation_controller = get_generation_controller()
+        self.memory_profiler = memory_profiler or (MemoryProfiler() if MEMORY_PROFILING else None)
+        self.intent_router = get_intent_router() if INTENT_ROUTING else None
+        self.last_response = ""
+        self.last_clip = None
+        self.speech_rate = None
+        self.acknowledgements = 0
 
     def start_session(self):
         print("👋 Hello! I'm ADAM, your friendly AI companion!")
         print("\nWhat would you like to talk about today?")
-        topic = input("Enter a topic: ").strip()
+        topic = input("Enter a topic (or 'resume <session id>' to continue a conversation): ").strip()
+        self.speech_rate = None
         
-        # Start the conversation with the chosen topic
-        initial_response = self.conversation_manager.start_new_conversation(topic)
-        print(f"\nADAM: {initial_response}")
-        self._play_response(initial_response)
+        resumed = False
+        if topic.lower().startswith("resume "):
+            # Pick up an earlier session where it left off; "resume writing tips" is still a topic
+            try:
+                last_response = self.conversation_manager.resume_session(topic[len("resume "):].strip())
+                resumed = True
+            except KeyError:
+                pass
+        if resumed:
+            print(f"\nWelcome back! We were talking about {self.conversation_manager.current_topic}.")
+            if last_response:
+                print(f"\nADAM: {last_response}")
+                self._play_response(last_response)
+        else:
+            # Start the conversation with the chosen topic
+            initial_response = self.conversation_manager.start_new_conversation(topic)
+            print(f"\nADAM: {initial_response}")
+            self._play_response(initial_response)
 
         while True:
             print("\nSelect your mode:")
@@ -36,11 +73,17 @@ class ConversationalAI:
 
             if mode == 'q':
                 print("\nADAM: It was great talking with you! Take care!")
+                self.audio_player.close()
+                self.conversation_manager.settle_analysis(timeout=None)  # Journal the last exchange
+                if self.memory_profiler:
+                    self.memory_profiler.discard(self.conversation_manager.session_id)
                 break
             elif mode == '3':
                 print("\nWhat would you like to talk about?")
                 new_topic = input("Enter new topic: ").strip()
                 if new_topic:
+                    if self.memory_profiler:
+                        self.memory_profiler.discard(self.conversation_manager.session_id)
                     initial_response = self.conversation_manager.start_new_conversation(new_topic)
                     print(f"\nADAM: {initial_response}")
                     self._play_response(initial_response)
@@ -63,9 +106,10 @@ class ConversationalAI:
             self.audio_recorder.start_recording()
             input()
             
-            if self.audio_recorder.stop_recording(self.recording_file):
+            frames = self.audio_recorder.stop_recording_frames()
+            if frames:
                 print("Processing your message...")
-                self._process_recording()
+                self._process_recording(frames)
             else:
                 print("No audio was recorded. Please try again.")
 
@@ -83,30 +127,112 @@ class ConversationalAI:
             else:
                 print("Message cannot be empty. Please try again.")
 
-    def _process_recording(self):
-        try:
-            audio_data = pathlib.Path(self.recording_file).read_bytes()
+    @contextmanager
+    def _stage(self, name: str):
+        """Time a pipeline stage and, when profiling is on, attribute its allocations"""
+        with self.stage_timer.stage(name):
+            if self.memory_profiler is None:
+                yield
+            else:
+                with self.memory_profiler.stage(name, self.conversation_manager.session_id):
+                    yield
+
+    def _end_turn(self):
+        if self.memory_profiler is None:
+            return
+        journal = self.conversation_manager.journal
+        self.memory_profiler.end_turn(
+            self.conversation_manager.session_id,
+            os.path.dirname(journal.path) if journal else None
+        )
+
+    def _process_recording(self, frames: List[bytes]):
+        # WAV assembly, resampling and silence trimming run in a worker process
+        with self._stage("preprocess"):
+            audio_data = self.audio_preprocessor.submit(frames, SAMPLE_RATE, AUDIO_CHANNELS).result()
+        if not audio_data:
+            print("No speech was detected. Please try again.")
+            return
+        with self._stage("transcribe"):
             user_input = self.ai_moderator.transcribe_audio(audio_data)
-            self._process_user_input(user_input)
-        finally:
-            if os.path.exists(self.recording_file):
-                os.remove(self.recording_file)
+        self._process_user_input(user_input)
 
     def _process_user_input(self, user_input: str):
+        if self._answer_locally(user_input):
+            self._end_turn()
+            return
+
+        # Record the previous exchange; its analysis only gets a short wait
+        with self._stage("context"):
+            self.conversation_manager.settle_analysis()
+
+        # Reply length adapts to the input, the conversation phase and current latency
+        token_limit = self.generation_controller.choose_limit(user_input, len(self.conversation_manager.history))
+
         # Generate AI response
-        prompt = self.conversation_manager.get_response_prompt(user_input)
-        ai_response = self.ai_moderator.generate_response(prompt)
+        with self._stage("prompt"):
+            prompt = self.conversation_manager.get_response_prompt(user_input, token_limit)
+        start = time.perf_counter()
+        with self._stage("generate"):
+            ai_response = self.ai_moderator.generate_response(prompt, max_output_tokens=token_limit)
+        # Shed, expired or failed calls say nothing about generation latency
+        if ai_response != FALLBACK_RESPONSE:
+            self.generation_controller.record(
+                time.perf_counter() - start, PromptBuilder.count_tokens(ai_response)
+            )
         
-        # Update conversation history
-        self.conversation_manager.add_interaction(user_input, ai_response)
+        # Context analysis continues in the background while the reply is spoken
+        with self._stage("context"):
+            self.conversation_manager.add_interaction(user_input, ai_response)
         
         # Output response
         print(f"\nADAM: {ai_response}")
         self._play_response(ai_response)
+        self._end_turn()
+
+    def _answer_locally(self, user_input: str) -> bool:
+        """Handle repeat, slow-down and acknowledgement inputs without Gemini; False for real turns"""
+        if self.intent_router is None or not self.last_response:
+            return False
+        with self._stage("route"):
+            route = self.intent_router.classify(
+                user_input, expects_answer=asks_question(self.last_response)
+            )
+
+        if route.intent == REPEAT:
+            # Replay the audio already synthesized for the last reply
+            print(f"\nADAM: {self.last_response}")
+            if self.last_clip is None:
+                self._play_response(self.last_response)
+            else:
+                with self._stage("playback"):
+                    self.audio_player.play_audio(self.last_clip)
+        elif route.intent == SLOW_DOWN:
+            # Every reply from now on is spoken at the slower rate
+            last_response = self.last_response
+            self.speech_rate = SLOW_SPEECH_RATE
+            print(f"\nADAM: {SLOW_DOWN_REPLY}")
+            self._play_response(SLOW_DOWN_REPLY)
+            print(f"ADAM: {last_response}")
+            self._play_response(last_response)
+        elif route.intent == ACKNOWLEDGE:
+            template = ACKNOWLEDGEMENT_REPLIES[self.acknowledgements % len(ACKNOWLEDGEMENT_REPLIES)]
+            self.acknowledgements += 1
+            reply = Template(template).safe_substitute(topic=self.conversation_manager.current_topic)
+            with self._stage("context"):
+                self.conversation_manager.add_interaction(user_input, reply, analyze=False)
+            print(f"\nADAM: {reply}")
+            self._play_response(reply)
+        else:
+            return False
+        return True
 
     def _play_response(self, text: str):
-        audio_response = self.tts.synthesize(text)
-        self.audio_player.play_audio(audio_response)
+        with self._stage("tts"):
+            audio_response = self.tts.synthesize(text, rate=self.speech_rate)
+        self.last_response, self.last_clip = text, audio_response
+        with self._stage("playback"):
+            self.audio_player.play_audio(audio_response)
 
 if __name__ == "__main__":
     ai = ConversationalAI()
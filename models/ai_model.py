@@ -1,48 +1,127 @@
 import google.generativeai as genai
-from typing import Tuple, List
-from config.settings import GOOGLE_API_KEY, GEMINI_MODEL_NAME
+import functools
+import hashlib
+from concurrent.futures import Future
+from string import Template
+from typing import List, Optional, TypedDict
+from config.settings import GOOGLE_API_KEY, GEMINI_MODEL_NAME, REPLY_TOKENS_BASE
+from core.prompt_builder import ADAM_SYSTEM_INSTRUCTION
+from core.context_tracker import ContextAnalysis
+from models.scheduler import ModelCallScheduler, PRIORITY_INTERACTIVE, PRIORITY_ANALYSIS, get_scheduler
+
+# Spoken when Gemini stays unavailable after the scheduler's retries
+FALLBACK_RESPONSE = "Sorry, I lost my train of thought for a moment. Could you say that again?"
+
+_ANALYSIS_TEMPLATE = Template(
+    "List the key topics (1-3 words each) and the student's emotional tone in this exchange.\n"
+    "User: $user_input\n"
+    "ADAM: $ai_response"
+)
+
+
+class AnalysisSchema(TypedDict):
+    topics: List[str]
+    emotions: List[str]
+
 
 class AIModerator:
-    def __init__(self):
+    def __init__(self, scheduler: Optional[ModelCallScheduler] = None):
+        self.scheduler = scheduler or get_scheduler()
         genai.configure(api_key=GOOGLE_API_KEY)
+        # The persona is set once per model instead of being resent every turn
         self.model = genai.GenerativeModel(
             GEMINI_MODEL_NAME,
             generation_config=genai.GenerationConfig(
-                max_output_tokens=150, 
+                max_output_tokens=REPLY_TOKENS_BASE, 
                 temperature=0.9
+            ),
+            system_instruction=ADAM_SYSTEM_INSTRUCTION
+        )
+        # Analysis output is constrained to a small JSON object of short tags
+        self.analysis_model = genai.GenerativeModel(
+            GEMINI_MODEL_NAME,
+            generation_config=genai.GenerationConfig(
+                max_output_tokens=64,
+                temperature=0.0,
+                response_mime_type="application/json",
+                response_schema=AnalysisSchema
             )
         )
         self.transcription_model = genai.GenerativeModel(GEMINI_MODEL_NAME)
 
+    def warmup(self):
+        """Open the connection to Gemini with a call that generates nothing"""
+        self.model.count_tokens("Hello")
+
     def transcribe_audio(self, audio_data: bytes) -> str:
-        response = self.transcription_model.generate_content([
-            "Transcribe the following audio:",
-            {"mime_type": "audio/wav", "data": audio_data}
-        ])
-        return response.text if response else ""
-
-    def generate_response(self, prompt: str) -> str:
-        response = self.model.generate_content(prompt)
-        return response.text if response else ""
-
-    def analyze_conversation_context(self, conversation_history: List[dict]) -> str:
-        """Analyze conversation to understand context and emotion"""
-        if not conversation_history:
-            return "beginning conversation"
-            
-        recent_exchanges = conversation_history[-3:]
-        emotions = []
-        topics = []
-        
-        for exchange in recent_exchanges:
-            # Extract key topics and emotional tone
-            prompt = f"""
-            Analyze this conversation exchange and return only key topics and emotional tone:
-            User: {exchange['user_input']}
-            ADAM: {exchange['ai_response']}
-            """
-            analysis = self.model.generate_content(prompt)
-            if analysis and analysis.text:
-                topics.extend(analysis.text.split(','))
-                
-        return ', '.join(set(topics))  # Return unique topics
\ No newline at end of file
+        key = ("transcribe", hashlib.blake2b(audio_data, digest_size=16).digest())
+        try:
+            response = self.scheduler.call(
+                GEMINI_MODEL_NAME,
+                self.transcription_model.generate_content,
+                ["Transcribe the following audio:", {"mime_type": "audio/wav", "data": audio_data}],
+                key=key,
+                priority=PRIORITY_INTERACTIVE
+            )
+        except Exception as e:
+            print(f"Error transcribing audio: {str(e)}")
+            return ""
+        return self._response_text(response)
+
+    def generate_response(self, prompt: str, max_output_tokens: Optional[int] = None) -> str:
+        generate = self.model.generate_content
+        if max_output_tokens:
+            # Overrides only the token limit; the rest of the model's config still applies
+            generate = functools.partial(generate, generation_config={"max_output_tokens": max_output_tokens})
+        try:
+            response = self.scheduler.call(
+                GEMINI_MODEL_NAME,
+                generate,
+                prompt,
+                key=("reply", prompt, max_output_tokens),
+                priority=PRIORITY_INTERACTIVE
+            )
+        except Exception as e:
+            print(f"Error generating response: {str(e)}")
+            return FALLBACK_RESPONSE
+        return self._response_text(response) or FALLBACK_RESPONSE
+
+    def submit_context_analysis(self, user_input: str, ai_response: str) -> Future:
+        """Queue tag extraction for the latest exchange; the future resolves to a ContextAnalysis"""
+        result: Future = Future()
+        if not user_input:
+            result.set_result(ContextAnalysis())
+            return result
+
+        prompt = _ANALYSIS_TEMPLATE.substitute(user_input=user_input.strip(), ai_response=ai_response.strip())
+        job = self.scheduler.submit(
+            GEMINI_MODEL_NAME,
+            self.analysis_model.generate_content,
+            prompt,
+            key=("analysis", prompt),
+            priority=PRIORITY_ANALYSIS
+        )
+
+        def collect(job: Future):
+            try:
+                result.set_result(ContextAnalysis.from_model_text(self._response_text(job.result())))
+            except Exception as e:
+                print(f"Error analyzing conversation: {str(e)}")
+                result.set_result(ContextAnalysis())
+
+        job.add_done_callback(collect)
+        return result
+
+    def analyze_conversation_context(self, user_input: str, ai_response: str) -> ContextAnalysis:
+        """Extract normalized topic and emotion tags from the latest exchange"""
+        return self.submit_context_analysis(user_input, ai_response).result()
+
+    @staticmethod
+    def _response_text(response) -> str:
+        """Return the response text, or an empty string for empty or blocked responses"""
+        if not response:
+            return ""
+        try:
+            return response.text
+        except ValueError:
+            return ""
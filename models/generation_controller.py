@@ -0,0 +1,131 @@
+import threading
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+from config.settings import (
+    REPLY_TOKENS_BASE,
+    REPLY_TOKENS_MIN,
+    REPLY_TOKENS_MAX,
+    GENERATION_LATENCY_SLO,
+)
+from core.metrics import LatencyHistogram
+
+# Adjustments to the token scale when p95 latency misses or comfortably meets the SLO
+TIGHTEN_FACTOR = 0.85
+RELAX_FACTOR = 1.05
+MIN_SCALE = 0.4
+RELAX_BELOW = 0.7         # Relax only while p95 is under this fraction of the SLO
+MIN_SAMPLES = 20          # Observations needed before latency drives the limit
+ADJUST_EVERY = 5          # Observations between scale adjustments
+
+
+class AdaptiveGenerationController:
+    """Chooses a reply token limit per turn from the student's input and measured latency.
+
+    The desired limit follows the conversation phase and how much the student
+    wrote. A process-wide scale shrinks it while p95 generation latency is over
+    the SLO and recovers slowly once latency is back under it. Latency is also
+    fitted as a fixed per-reply overhead plus a cost per output token, and the
+    limit is capped so the predicted latency of a full-length reply fits the SLO.
+    """
+
+    def __init__(self, base_tokens: int = REPLY_TOKENS_BASE, min_tokens: int = REPLY_TOKENS_MIN,
+                 max_tokens: int = REPLY_TOKENS_MAX, latency_slo: float = GENERATION_LATENCY_SLO,
+                 window: int = 200):
+        self.base_tokens = base_tokens
+        self.min_tokens = min_tokens
+        self.max_tokens = max_tokens
+        self.latency_slo = latency_slo
+        self.latency = LatencyHistogram(window)
+        self.samples = deque(maxlen=window)  # (output_tokens, seconds)
+        self.scale = 1.0
+        self.observations = 0
+        self.last_limit: Optional[int] = None
+        self.lock = threading.Lock()
+
+    def desired_tokens(self, user_input: str, turn_index: int) -> float:
+        """Token budget before latency control: short inputs get short replies"""
+        words = len(user_input.split())
+        if words <= 3:
+            length_factor = 0.5   # "ok", "yes", one-word answers
+        elif words <= 12:
+            length_factor = 0.8
+        elif words <= 40:
+            length_factor = 1.0
+        else:
+            length_factor = 1.3
+
+        # Early turns build rapport; later turns keep the exchange brisk
+        phase_factor = 1.0 if turn_index <= 3 else 0.9
+        return self.base_tokens * length_factor * phase_factor
+
+    def choose_limit(self, user_input: str, turn_index: int) -> int:
+        limit = self.desired_tokens(user_input, turn_index) * self.scale
+        fit = self.latency_fit()
+        if fit:
+            overhead, per_token = fit
+            if per_token > 0:
+                limit = min(limit, (self.latency_slo - overhead) / per_token)
+        limit = int(max(self.min_tokens, min(self.max_tokens, limit)))
+        self.last_limit = limit
+        return limit
+
+    def record(self, seconds: float, output_tokens: int):
+        """Record one generation's latency and the number of tokens it produced"""
+        self.latency.record(seconds)
+
+        with self.lock:
+            if output_tokens > 0:
+                self.samples.append((output_tokens, seconds))
+            self.observations += 1
+            if self.observations < MIN_SAMPLES or self.observations % ADJUST_EVERY:
+                return
+            p95 = self.latency.percentile(95)
+            if p95 > self.latency_slo:
+                self.scale = max(MIN_SCALE, self.scale * TIGHTEN_FACTOR)
+            elif p95 < self.latency_slo * RELAX_BELOW:
+                self.scale = min(1.0, self.scale * RELAX_FACTOR)
+
+    def latency_fit(self) -> Optional[Tuple[float, float]]:
+        """Least-squares (overhead seconds, seconds per token) over recent replies, None until it is meaningful.
+
+        Dividing latency by tokens would charge the fixed time to first token
+        to every token, so short replies would look slow and pin the limit low.
+        """
+        with self.lock:
+            samples = list(self.samples)
+        if len(samples) < MIN_SAMPLES:
+            return None
+        count = len(samples)
+        mean_tokens = sum(tokens for tokens, _ in samples) / count
+        mean_seconds = sum(seconds for _, seconds in samples) / count
+        spread = sum((tokens - mean_tokens) ** 2 for tokens, _ in samples)
+        if spread == 0:
+            return None
+        per_token = sum((tokens - mean_tokens) * (seconds - mean_seconds) for tokens, seconds in samples) / spread
+        return mean_seconds - per_token * mean_tokens, per_token
+
+    def get_metrics(self) -> Dict[str, Any]:
+        overhead, per_token = self.latency_fit() or (None, None)
+        return {
+            "latency_slo": self.latency_slo,
+            "scale": self.scale,
+            "last_limit": self.last_limit,
+            "observations": self.observations,
+            "latency_p50": self.latency.percentile(50),
+            "latency_p95": self.latency.percentile(95),
+            "latency_overhead": overhead,
+            "latency_per_token": per_token,
+        }
+
+
+_default_controller: Optional[AdaptiveGenerationController] = None
+_default_lock = threading.Lock()
+
+
+def get_generation_controller() -> AdaptiveGenerationController:
+    """Return the process-wide controller, so every session shares the latency picture"""
+    global _default_controller
+    with _default_lock:
+        if _default_controller is None:
+            _default_controller = AdaptiveGenerationController()
+        return _default_controller
@@ -0,0 +1,261 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+from google.api_core import exceptions as google_exceptions
+from config.settings import (
+    GEMINI_REQUESTS_PER_MINUTE,
+    GEMINI_BURST,
+    SCHEDULER_WORKERS,
+    SCHEDULER_MAX_RETRIES,
+    SCHEDULER_BACKOFF_BASE,
+    SCHEDULER_BACKOFF_MAX,
+    SCHEDULER_INTERACTIVE_DEADLINE,
+    SCHEDULER_ANALYSIS_DEADLINE,
+    SCHEDULER_ANALYSIS_MAX_QUEUE,
+)
+
+# Priority lanes, lower runs first
+PRIORITY_INTERACTIVE = 0  # Replies and transcriptions the student is waiting for
+PRIORITY_ANALYSIS = 1     # Background context analysis
+
+LANE_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_ANALYSIS: "analysis"}
+LANE_DEADLINES = {PRIORITY_INTERACTIVE: SCHEDULER_INTERACTIVE_DEADLINE, PRIORITY_ANALYSIS: SCHEDULER_ANALYSIS_DEADLINE}
+
+# 429 and 5xx responses are retried with exponential backoff
+RETRYABLE_ERRORS = (
+    google_exceptions.TooManyRequests,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.InternalServerError,
+    google_exceptions.BadGateway,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.GatewayTimeout,
+    google_exceptions.DeadlineExceeded,
+)
+
+
+class SchedulerOverloaded(Exception):
+    """A call was shed at submission or waited in the queue past its deadline"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at `rate` tokens per second"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """Take a token if one is available, otherwise return the seconds until one is"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+class _Job:
+    __slots__ = ("model_name", "fn", "args", "key", "priority", "future", "enqueued", "expires",
+                 "not_before", "attempt")
+
+    def __init__(self, model_name: str, fn: Callable, args: Tuple, key: Optional[Hashable], priority: int,
+                 deadline: float):
+        self.model_name = model_name
+        self.fn = fn
+        self.args = args
+        self.key = key
+        self.priority = priority
+        self.future: Future = Future()
+        self.enqueued = time.monotonic()
+        self.expires = self.enqueued + deadline
+        self.not_before = 0.0
+        self.attempt = 0
+
+
+class ModelCallScheduler:
+    """Runs Gemini calls on a shared worker pool.
+
+    Calls are rate limited per model with a token bucket, served by priority
+    lane, deduplicated while an identical call is in flight, and retried with
+    capped exponential backoff on 429/5xx errors. Each lane has a queue
+    deadline: calls that would wait longer than it are shed up front, and
+    calls still queued when it passes fail instead of running late.
+    """
+
+    def __init__(self, workers: int = SCHEDULER_WORKERS,
+                 requests_per_minute: float = GEMINI_REQUESTS_PER_MINUTE,
+                 burst: float = GEMINI_BURST,
+                 max_retries: int = SCHEDULER_MAX_RETRIES):
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst
+        self.max_retries = max_retries
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.queue: List[Tuple[int, float, int, _Job]] = []
+        self.lane_depth: Dict[int, int] = {priority: 0 for priority in LANE_NAMES}
+        self.in_flight: Dict[Hashable, Future] = {}
+        self.condition = threading.Condition()
+        self.sequence = itertools.count()
+        self.metrics: Dict[str, Any] = {
+            "submitted": 0,
+            "deduplicated": 0,
+            "completed": 0,
+            "failed": 0,
+            "retries": 0,
+            "shed": 0,
+            "expired": 0,
+            "max_queue_depth": 0,
+            "max_queue_wait": 0.0,
+        }
+        self.workers = [
+            threading.Thread(target=self._worker_loop, name=f"gemini-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, model_name: str, fn: Callable, *args, key: Optional[Hashable] = None,
+               priority: int = PRIORITY_INTERACTIVE, deadline: Optional[float] = None) -> Future:
+        """Queue `fn(*args)`; calls sharing a `key` while one is in flight share its result.
+
+        The future fails with SchedulerOverloaded if the call cannot start
+        within `deadline` seconds (the lane's default when None).
+        """
+        deadline = LANE_DEADLINES.get(priority, SCHEDULER_ANALYSIS_DEADLINE) if deadline is None else deadline
+        with self.condition:
+            self.metrics["submitted"] += 1
+            if key is not None and key in self.in_flight:
+                self.metrics["deduplicated"] += 1
+                return self.in_flight[key]
+
+            overloaded = self._shed_reason(priority, deadline)
+            if overloaded:
+                self.metrics["shed"] += 1
+                future: Future = Future()
+                future.set_exception(SchedulerOverloaded(overloaded))
+                return future
+
+            job = _Job(model_name, fn, args, key, priority, deadline)
+            if key is not None:
+                self.in_flight[key] = job.future
+            self._push(job)
+            self.metrics["max_queue_depth"] = max(self.metrics["max_queue_depth"], len(self.queue))
+            return job.future
+
+    def call(self, model_name: str, fn: Callable, *args, key: Optional[Hashable] = None,
+             priority: int = PRIORITY_INTERACTIVE, deadline: Optional[float] = None) -> Any:
+        return self.submit(model_name, fn, *args, key=key, priority=priority, deadline=deadline).result()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self.condition:
+            depth = {LANE_NAMES.get(priority, str(priority)): n for priority, n in self.lane_depth.items()}
+            return dict(self.metrics, queue_depth=depth, in_flight=len(self.in_flight))
+
+    def _shed_reason(self, priority: int, deadline: float) -> str:
+        """Why a new call should be rejected now rather than queued, or '' to accept it"""
+        if priority >= PRIORITY_ANALYSIS and self.lane_depth.get(priority, 0) >= SCHEDULER_ANALYSIS_MAX_QUEUE:
+            return f"{LANE_NAMES.get(priority, priority)} queue is full"
+        # Calls at this priority or more urgent are served first, at the rate limit
+        ahead = sum(n for lane, n in self.lane_depth.items() if lane <= priority)
+        expected_wait = max(0, ahead - self.burst) / (self.requests_per_minute / 60.0)
+        if expected_wait > deadline:
+            return f"expected queue wait {expected_wait:.1f}s exceeds the {deadline:.1f}s deadline"
+        return ""
+
+    def _push(self, job: _Job):
+        heapq.heappush(self.queue, (job.priority, job.not_before, next(self.sequence), job))
+        self.lane_depth[job.priority] = self.lane_depth.get(job.priority, 0) + 1
+        self.condition.notify()
+
+    def _pop(self) -> _Job:
+        job = heapq.heappop(self.queue)[3]
+        self.lane_depth[job.priority] -= 1
+        return job
+
+    def _bucket(self, model_name: str) -> TokenBucket:
+        if model_name not in self.buckets:
+            self.buckets[model_name] = TokenBucket(self.requests_per_minute / 60.0, self.burst)
+        return self.buckets[model_name]
+
+    def _next_job(self) -> _Job:
+        """Block until the highest-priority job is due and has a rate-limit token"""
+        with self.condition:
+            while True:
+                if not self.queue:
+                    self.condition.wait()
+                    continue
+                _, not_before, _, job = self.queue[0]
+                now = time.monotonic()
+                if now > job.expires:
+                    # Returned without a rate-limit token; the worker fails it
+                    return self._pop()
+                wait = not_before - now
+                if wait <= 0:
+                    wait = self._bucket(job.model_name).try_acquire()
+                if wait <= 0:
+                    self._pop()
+                    queue_wait = time.monotonic() - job.enqueued
+                    self.metrics["max_queue_wait"] = max(self.metrics["max_queue_wait"], queue_wait)
+                    return job
+                # Woken early if a more urgent job arrives
+                self.condition.wait(timeout=wait)
+
+    def _worker_loop(self):
+        while True:
+            job = self._next_job()
+            if time.monotonic() > job.expires:
+                with self.condition:
+                    self.metrics["expired"] += 1
+                self._finish(job, error=SchedulerOverloaded("call waited in the queue past its deadline"))
+                continue
+            try:
+                result = job.fn(*job.args)
+            except RETRYABLE_ERRORS as e:
+                if job.attempt < self.max_retries:
+                    self._requeue_with_backoff(job)
+                else:
+                    self._finish(job, error=e)
+            except Exception as e:
+                self._finish(job, error=e)
+            else:
+                self._finish(job, result=result)
+
+    def _requeue_with_backoff(self, job: _Job):
+        job.attempt += 1
+        delay = min(SCHEDULER_BACKOFF_MAX, SCHEDULER_BACKOFF_BASE * 2 ** (job.attempt - 1))
+        delay *= random.uniform(0.5, 1.0)  # Jitter so retries from many sessions spread out
+        job.not_before = time.monotonic() + delay
+        with self.condition:
+            self.metrics["retries"] += 1
+            self._push(job)
+
+    def _finish(self, job: _Job, result: Any = None, error: Optional[BaseException] = None):
+        with self.condition:
+            if job.key is not None:
+                self.in_flight.pop(job.key, None)
+            self.metrics["failed" if error else "completed"] += 1
+        if error:
+            job.future.set_exception(error)
+        else:
+            job.future.set_result(result)
+
+
+_default_scheduler: Optional[ModelCallScheduler] = None
+_default_lock = threading.Lock()
+
+
+def get_scheduler() -> ModelCallScheduler:
+    """Return the process-wide scheduler shared by every session"""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = ModelCallScheduler()
+        return _default_scheduler
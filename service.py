@@ -0,0 +1,238 @@
+"""Service mode: warm pipelines, dependency probes and health endpoints.
+
+Usage:
+    python service.py                # Real Gemini and Polly
+    python service.py --stub         # Local stand-ins, no network access needed
+
+Endpoints:
+    GET /healthz   Liveness: the process is up and serving requests
+    GET /readyz    Readiness: dependencies answered the last probe and a warm pipeline is available
+    GET /metrics   Dependency latency, pool, scheduler and generation metrics
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from config.settings import SERVICE_PORT, WARM_POOL_SIZE, SERVICE_PROBE_INTERVAL
+from core.intent_router import get_intent_router
+from core.stub_backends import StubAIModerator, StubTextToSpeech, NullAudioPlayer
+from main import ConversationalAI
+from models.generation_controller import get_generation_controller
+
+
+class PipelinePool:
+    """Keeps `size` warmed-up ConversationalAI pipelines ready to hand to new sessions"""
+
+    def __init__(self, factory: Callable[[], ConversationalAI], size: int = WARM_POOL_SIZE):
+        self.factory = factory
+        self.size = size
+        self.available: List[ConversationalAI] = []
+        self.in_use = 0
+        self.created = 0
+        self.cold_starts = 0
+        self.condition = threading.Condition()
+        self.filler = threading.Thread(target=self._fill_loop, name="pipeline-pool", daemon=True)
+
+    def start(self):
+        self.filler.start()
+
+    def _create(self) -> ConversationalAI:
+        pipeline = self.factory()
+        pipeline.ai_moderator.warmup()
+        pipeline.tts.warmup()
+        with self.condition:
+            self.created += 1
+        return pipeline
+
+    def _fill_loop(self):
+        while True:
+            with self.condition:
+                while len(self.available) >= self.size:
+                    self.condition.wait()
+            try:
+                pipeline = self._create()
+            except Exception as e:
+                print(f"Error warming up pipeline: {str(e)}")
+                time.sleep(5)
+                continue
+            with self.condition:
+                self.available.append(pipeline)
+                self.condition.notify_all()
+
+    def acquire(self) -> ConversationalAI:
+        """Take a warm pipeline, building one on the spot only if the pool is empty"""
+        with self.condition:
+            if self.available:
+                pipeline = self.available.pop()
+                self.in_use += 1
+                self.condition.notify_all()  # Wake the filler to replace it
+                return pipeline
+            self.cold_starts += 1
+        pipeline = self._create()
+        with self.condition:
+            self.in_use += 1
+        return pipeline
+
+    def release(self, pipeline: ConversationalAI):
+        """Return a pipeline after its session ends, keeping it if the pool is short"""
+        pipeline.conversation_manager.clear_history()
+        with self.condition:
+            self.in_use -= 1
+            if len(self.available) < self.size:
+                self.available.append(pipeline)
+                self.condition.notify_all()
+
+    def stats(self) -> Dict:
+        with self.condition:
+            return {
+                "target_size": self.size,
+                "available": len(self.available),
+                "in_use": self.in_use,
+                "created": self.created,
+                "cold_starts": self.cold_starts,
+            }
+
+
+class ConversationService:
+    """Owns the warm pool, probes Gemini and Polly periodically and serves health endpoints"""
+
+    def __init__(self, stub: bool = False, pool_size: int = WARM_POOL_SIZE, port: int = SERVICE_PORT,
+                 probe_interval: float = SERVICE_PROBE_INTERVAL):
+        self.stub = stub
+        self.port = port
+        self.probe_interval = probe_interval
+        self.pool = PipelinePool(self._build_pipeline, pool_size)
+        self.probes: Dict[str, Dict] = {}
+        self.probe_pipeline: Optional[ConversationalAI] = None
+        self.started_at = time.time()
+        self.server: Optional[ThreadingHTTPServer] = None
+
+    def _build_pipeline(self) -> ConversationalAI:
+        if self.stub:
+            return ConversationalAI(
+                ai_moderator=StubAIModerator(),
+                tts=StubTextToSpeech(),
+                audio_player=NullAudioPlayer()
+            )
+        return ConversationalAI()
+
+    def _probe(self, name: str, check: Callable[[], None]):
+        start = time.perf_counter()
+        try:
+            check()
+            result = {"ok": True, "latency": time.perf_counter() - start}
+        except Exception as e:
+            result = {"ok": False, "latency": time.perf_counter() - start, "error": str(e)}
+        result["checked_at"] = time.time()
+        self.probes[name] = result
+
+    def run_probes(self):
+        if self.probe_pipeline is None:
+            try:
+                self.probe_pipeline = self._build_pipeline()
+            except Exception as e:
+                for name in ("gemini", "polly"):
+                    self.probes[name] = {"ok": False, "error": str(e), "checked_at": time.time()}
+                return
+        self._probe("gemini", self.probe_pipeline.ai_moderator.warmup)
+        self._probe("polly", self.probe_pipeline.tts.warmup)
+
+    def _probe_loop(self):
+        while True:
+            time.sleep(self.probe_interval)
+            self.run_probes()
+
+    def is_ready(self) -> bool:
+        """Ready while dependencies answer and a warm pipeline is waiting, so a new session never cold-starts"""
+        dependencies_ok = bool(self.probes) and all(probe["ok"] for probe in self.probes.values())
+        with self.pool.condition:
+            return dependencies_ok and len(self.pool.available) > 0
+
+    def status(self) -> Dict:
+        return {
+            "ready": self.is_ready(),
+            "uptime": time.time() - self.started_at,
+            "dependencies": self.probes,
+            "pool": self.pool.stats(),
+        }
+
+    def metrics(self) -> Dict:
+        metrics = self.status()
+        metrics["generation"] = get_generation_controller().get_metrics()
+        metrics["intents"] = get_intent_router().get_metrics()
+        if not self.stub:
+            from models.scheduler import get_scheduler
+            metrics["scheduler"] = get_scheduler().get_metrics()
+        return metrics
+
+    def start(self):
+        """Probe dependencies, start filling the pool and serve health endpoints in the background"""
+        self.run_probes()
+        self.pool.start()
+        threading.Thread(target=self._probe_loop, name="dependency-probes", daemon=True).start()
+        self.server = ThreadingHTTPServer(("0.0.0.0", self.port), _handler_for(self))
+        threading.Thread(target=self.server.serve_forever, name="health-server", daemon=True).start()
+        print(f"Health endpoints listening on port {self.port}")
+
+    def serve_terminal_sessions(self):
+        """Hand a warm pipeline to each student at the terminal, one session after another"""
+        while True:
+            pipeline = self.pool.acquire()
+            try:
+                pipeline.start_session()
+            finally:
+                self.pool.release(pipeline)
+            if input("\nPress Enter for the next student, or type 'q' to stop: ").strip().lower() == 'q':
+                break
+
+
+def _handler_for(service: ConversationService):
+    class HealthHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/healthz":
+                self._send(200, {"status": "ok"})
+            elif self.path == "/readyz":
+                status = service.status()
+                self._send(200 if status["ready"] else 503, status)
+            elif self.path == "/metrics":
+                self._send(200, service.metrics())
+            else:
+                self._send(404, {"error": "not found"})
+
+        def _send(self, code: int, body: Dict):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass  # Probes every few seconds would flood the console
+
+    return HealthHandler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run ADAM in service mode with health endpoints")
+    parser.add_argument("--stub", action="store_true", help="Use local stand-ins for Gemini, Polly and playback")
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--pool-size", type=int, default=WARM_POOL_SIZE)
+    args = parser.parse_args(argv)
+
+    service = ConversationService(stub=args.stub, pool_size=args.pool_size, port=args.port)
+    service.start()
+
+    if sys.stdin.isatty():
+        service.serve_terminal_sessions()
+    else:
+        # Detached container: keep serving health endpoints until stopped
+        threading.Event().wait()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""Pack closed sessions from sessions_history into compressed daily archives.
+
+Usage:
+    python -m tools.compact_sessions --min-age-minutes 120
+    python -m tools.compact_sessions --dry-run
+    python -m tools.compact_sessions --parquet turns.parquet
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.session_archive import ARCHIVE_DIR_NAME, SessionArchive
+from core.session_journal import JOURNAL_FILE, LEGACY_HISTORY_FILE
+
+
+def last_write(session_folder: str) -> float:
+    """Most recent modification time of the session's files"""
+    times = [os.path.getmtime(path) for path in glob.glob(os.path.join(session_folder, "*"))]
+    return max(times, default=os.path.getmtime(session_folder))
+
+
+def closed_sessions(sessions_dir: str, min_age_seconds: float):
+    """Session folders with a journal or history file that nothing has written to recently"""
+    now = time.time()
+    for session_folder in sorted(glob.glob(os.path.join(sessions_dir, "*", ""))):
+        session_folder = session_folder.rstrip(os.sep)
+        if os.path.basename(session_folder) == ARCHIVE_DIR_NAME:
+            continue
+        if not any(os.path.exists(os.path.join(session_folder, name)) for name in (JOURNAL_FILE, LEGACY_HISTORY_FILE)):
+            continue
+        if now - last_write(session_folder) >= min_age_seconds:
+            yield session_folder
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compact closed sessions into gzip JSON Lines archives")
+    parser.add_argument("--sessions-dir", default="sessions_history")
+    parser.add_argument("--min-age-minutes", type=float, default=60.0,
+                        help="Only pack sessions with no writes for this long")
+    parser.add_argument("--dry-run", action="store_true", help="List the sessions that would be packed")
+    parser.add_argument("--parquet", help="After compaction, export every archived turn to this Parquet file")
+    args = parser.parse_args(argv)
+
+    archive = SessionArchive(os.path.join(args.sessions_dir, ARCHIVE_DIR_NAME))
+    packed = skipped = failed = 0
+    for session_folder in closed_sessions(args.sessions_dir, args.min_age_minutes * 60):
+        if args.dry_run:
+            print(f"Would pack {session_folder}")
+            continue
+        try:
+            if archive.pack(session_folder):
+                packed += 1
+            else:
+                skipped += 1
+        except Exception as e:
+            failed += 1
+            print(f"Error packing {session_folder}: {str(e)}")
+
+    if not args.dry_run:
+        print(f"Packed {packed} sessions ({skipped} already archived, {failed} failed) into {archive.archive_dir}")
+
+    if args.parquet:
+        try:
+            rows = archive.export_parquet(args.parquet)
+        except RuntimeError as e:
+            print(f"Error exporting turns: {str(e)}")
+            return 1
+        print(f"Exported {rows} turns to {args.parquet}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""Replay recorded sessions as scripted students against ConversationalAI.
+
+Usage:
+    python -m tools.replay_sessions --backend stub --concurrency 30 --rate 2
+    python -m tools.replay_sessions --backend real --limit 5 --report report.json
+"""
+import argparse
+import contextlib
+import glob
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.intent_router import get_intent_router
+from core.metrics import StageTimer
+from core.profiling import MemoryProfiler
+from core.session_archive import ARCHIVE_DIR_NAME, SessionArchive
+from core.session_journal import read_session
+from core.stub_backends import StubAIModerator, StubTextToSpeech, NullAudioPlayer
+from main import ConversationalAI
+from models.generation_controller import get_generation_controller
+
+STAGES = ["opening", "route", "prompt", "generate", "context", "tts", "playback", "turn"]
+
+
+def iter_recorded_sessions(sessions_dir: str):
+    """Yield (header, interactions) for every session folder, then every archived session"""
+    for session_folder in sorted(glob.glob(os.path.join(sessions_dir, "*", ""))):
+        try:
+            yield read_session(session_folder)
+        except (OSError, ValueError, KeyError):
+            continue
+    archive = SessionArchive(os.path.join(sessions_dir, ARCHIVE_DIR_NAME))
+    for session_id in archive.session_ids():
+        yield archive.read(session_id)
+
+
+def load_scripts(sessions_dir: str, limit: int = 0) -> List[Dict]:
+    """Load recorded sessions as scripts of (topic, student messages)"""
+    scripts = []
+    for header, interactions in iter_recorded_sessions(sessions_dir):
+        messages = [turn.user_input.strip() for turn in interactions if turn.user_input.strip()]
+        if header.get("current_topic") and messages:
+            scripts.append({
+                "session_id": header["session_id"],
+                "topic": header["current_topic"],
+                "messages": messages,
+            })
+        if limit and len(scripts) >= limit:
+            break
+    return scripts
+
+
+def build_pipeline(args, stage_timer: StageTimer, output_dir: str, seed: int,
+                   memory_profiler: MemoryProfiler = None) -> ConversationalAI:
+    if args.backend == "stub":
+        return ConversationalAI(
+            ai_moderator=StubAIModerator(
+                reply_latency=args.stub_reply_latency,
+                analysis_latency=args.stub_analysis_latency,
+                seed=seed
+            ),
+            tts=StubTextToSpeech(seed=seed),
+            audio_player=NullAudioPlayer(),
+            sessions_dir=output_dir,
+            stage_timer=stage_timer,
+            memory_profiler=memory_profiler
+        )
+    # Real Gemini and Polly, but nothing is played on the load host
+    return ConversationalAI(audio_player=NullAudioPlayer(), sessions_dir=output_dir, stage_timer=stage_timer,
+                            memory_profiler=memory_profiler)
+
+
+def run_student(args, script: Dict, stage_timer: StageTimer, output_dir: str, seed: int,
+                memory_profiler: MemoryProfiler = None) -> int:
+    """Play one recorded session from start to finish, returning the number of turns completed"""
+    pipeline = build_pipeline(args, stage_timer, output_dir, seed, memory_profiler)
+    think = random.Random(seed)
+
+    with stage_timer.stage("opening"):
+        opening = pipeline.conversation_manager.start_new_conversation(script["topic"])
+    pipeline._play_response(opening)
+
+    turns = 0
+    for message in script["messages"]:
+        if args.think_time:
+            time.sleep(think.expovariate(1.0 / args.think_time))
+        with stage_timer.stage("turn"):
+            pipeline._process_user_input(message)
+        turns += 1
+    pipeline.conversation_manager.settle_analysis(timeout=None)
+    return turns
+
+
+def format_report(report: Dict) -> str:
+    lines = [
+        f"Students: {report['students']}  Turns: {report['turns']}  Errors: {report['errors']}",
+        f"Wall time: {report['wall_time']:.2f}s  Throughput: {report['turns_per_second']:.2f} turns/s",
+        "",
+        f"{'stage':<10}{'count':>7}{'mean':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}",
+    ]
+    for stage in STAGES:
+        stats = report["stages"].get(stage)
+        if not stats:
+            continue
+        lines.append(
+            f"{stage:<10}{stats['count']:>7}"
+            + "".join(f"{stats[key]:>9.3f}" for key in ("mean", "p50", "p90", "p99", "max"))
+        )
+
+    generation = report["generation"]
+    lines += [
+        "",
+        f"Reply token scale: {generation['scale']:.2f}  Last limit: {generation['last_limit']}  "
+        f"Generate p95: {generation['latency_p95']:.3f}s (SLO {generation['latency_slo']}s)",
+        "Intents: " + ", ".join(f"{intent} {count}" for intent, count in sorted(report["intents"].items())),
+    ]
+
+    turn = report["stages"].get("turn")
+    if turn and turn["count"]:
+        lines += ["", "Turn latency histogram:"]
+        widest = max(turn["buckets"].values())
+        for bucket, count in turn["buckets"].items():
+            bar = "#" * (int(40 * count / widest) if widest else 0)
+            lines.append(f"{bucket:>9} {count:>6} {bar}")
+
+    memory = report.get("memory")
+    if memory:
+        lines += ["", f"{'memory':<10}{'count':>7}{'peak max':>12}{'peak mean':>12}{'retained':>12}"]
+        for stage in STAGES:
+            stats = memory["stages"].get(stage)
+            if stats:
+                lines.append(
+                    f"{stage:<10}{stats['count']:>7}{stats['peak_max']:>12}"
+                    f"{stats['peak_mean']:>12}{stats['retained_total']:>12}"
+                )
+        lines.append(f"Traced now: {memory['traced_current']} bytes  "
+                     f"Leaks suspected: {len(memory['leak_suspected'])} sessions")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay sessions_history conversations as a load test")
+    parser.add_argument("--sessions-dir", default="sessions_history", help="Recorded sessions to replay")
+    parser.add_argument("--backend", choices=["stub", "real"], default="stub")
+    parser.add_argument("--concurrency", type=int, default=10, help="Maximum simultaneous students")
+    parser.add_argument("--rate", type=float, default=1.0, help="Student arrivals per second (Poisson)")
+    parser.add_argument("--students", type=int, default=0, help="Students to run, cycling the scripts (default: one per script)")
+    parser.add_argument("--limit", type=int, default=0, help="Only load this many recorded sessions")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Mean seconds a student waits between messages")
+    parser.add_argument("--stub-reply-latency", type=float, default=0.8)
+    parser.add_argument("--stub-analysis-latency", type=float, default=0.4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--report", help="Write the JSON report to this file")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="Trace allocations per stage (exact only with --concurrency 1)")
+    args = parser.parse_args(argv)
+
+    scripts = load_scripts(args.sessions_dir, args.limit)
+    if not scripts:
+        print(f"No replayable sessions found in {args.sessions_dir}")
+        return 1
+    students = args.students or len(scripts)
+    arrivals = random.Random(args.seed)
+    stage_timer = StageTimer(window=100000)
+    output_dir = tempfile.mkdtemp(prefix="replay_sessions_")
+    errors = []
+    errors_lock = threading.Lock()
+    memory_profiler = MemoryProfiler() if args.profile_memory else None
+
+    print(f"Replaying {students} students from {len(scripts)} sessions "
+          f"({args.backend} backend, concurrency {args.concurrency}, {args.rate}/s arrivals)")
+
+    def student(index: int) -> int:
+        try:
+            return run_student(args, scripts[index % len(scripts)], stage_timer, output_dir, args.seed + index,
+                               memory_profiler)
+        except Exception as e:
+            with errors_lock:
+                errors.append(f"{scripts[index % len(scripts)]['session_id']}: {e}")
+            return 0
+
+    start = time.perf_counter()
+    # The pipeline prints every reply; keep the report readable
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            futures = []
+            for index in range(students):
+                futures.append(pool.submit(student, index))
+                if args.rate > 0:
+                    time.sleep(arrivals.expovariate(args.rate))
+            turns = sum(future.result() for future in futures)
+    wall_time = time.perf_counter() - start
+
+    report = {
+        "backend": args.backend,
+        "students": students,
+        "turns": turns,
+        "errors": len(errors),
+        "wall_time": wall_time,
+        "turns_per_second": turns / wall_time if wall_time else 0.0,
+        "stages": stage_timer.summary(STAGES),
+        "generation": get_generation_controller().get_metrics(),
+        "intents": get_intent_router().get_metrics(),
+    }
+    if memory_profiler:
+        report["memory"] = memory_profiler.summary()
+    print(format_report(report))
+    for error in errors[:10]:
+        print(f"Error: {error}")
+    print(f"Replayed session files written to {output_dir}")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as file:
+            json.dump(dict(report, error_messages=errors), file, indent=4)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())